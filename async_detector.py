@@ -0,0 +1,117 @@
+import asyncio
+import collections
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from detector_pool import get_pool
+from pose_detector import PoseDetector
+
+REJECT = "reject"
+DROP_OLDEST = "drop_oldest"
+
+
+class OverloadError(RuntimeError):
+    """Raised when a frame is submitted while the queue is full and overload="reject"."""
+
+
+class FrameDropped(RuntimeError):
+    """Raised to the caller whose queued frame was displaced by a newer one (overload="drop_oldest")."""
+
+
+# Per-process detector for the process executor
+_process_detector = None
+
+
+def _init_process_detector(options):
+    global _process_detector
+    _process_detector = PoseDetector(**options)
+
+
+def _detect_in_process(img):
+    return _process_detector.detect(img)
+
+
+class AsyncPoseDetector:
+    """Runs PoseDetector.detect on a bounded executor without blocking the event loop.
+
+    At most `workers` frames are in inference at once and at most `max_queue` wait behind
+    them. When the queue is full, overload="reject" fails the new frame with OverloadError
+    and overload="drop_oldest" fails the oldest waiting frame with FrameDropped instead.
+
+    Any idle detector may take a frame, so detectors run in static_image_mode unless
+    options say otherwise: in video mode one caller's tracking state would leak into the
+    next caller's results.
+    """
+
+    def __init__(self, workers=1, max_queue=4, overload=REJECT, use_processes=False, options=None, pool=None):
+        if overload not in (REJECT, DROP_OLDEST):
+            raise ValueError(f"overload must be {REJECT!r} or {DROP_OLDEST!r}, not {overload!r}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.overload = overload
+        self.options = {"static_image_mode": True, **(options or {})}
+        if use_processes:
+            self._executor = ProcessPoolExecutor(
+                workers, initializer=_init_process_detector, initargs=(self.options,)
+            )
+            self._run = _detect_in_process
+        else:
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="pose-detect")
+            self.pool = pool or get_pool()
+            self._run = self._detect_in_thread
+        self._pending = collections.deque()
+        self._in_flight = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    @property
+    def queue_depth(self):
+        return len(self._pending)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def _detect_in_thread(self, img):
+        # Each call checks out its own warm detector, so workers never contend on a MediaPipe graph.
+        # Successive frames may land on different detectors, hence static_image_mode by default.
+        with self.pool.checkout(**self.options) as detector:
+            return detector.detect(img)
+
+    async def detect(self, img):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if self._in_flight < self.workers:
+            self._start(loop, img, future)
+        else:
+            if len(self._pending) >= self.max_queue:
+                if self.overload == REJECT or not self._pending:
+                    self.rejected += 1
+                    raise OverloadError("pose detection queue is full")
+                _, oldest = self._pending.popleft()
+                self.dropped += 1
+                if not oldest.done():
+                    oldest.set_exception(FrameDropped("frame dropped for a newer one"))
+            self._pending.append((img, future))
+        return await future
+
+    def _start(self, loop, img, future):
+        self._in_flight += 1
+        task = loop.run_in_executor(self._executor, self._run, img)
+        task.add_done_callback(lambda done: self._finish(loop, done, future))
+
+    def _finish(self, loop, done, future):
+        self._in_flight -= 1
+        if not future.done():
+            if done.exception() is not None:
+                future.set_exception(done.exception())
+            else:
+                future.set_result(done.result())
+        # Start the next waiting frame whose caller is still interested
+        while self._pending:
+            img, next_future = self._pending.popleft()
+            if not next_future.done():
+                self._start(loop, img, next_future)
+                break
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from landmark_cache import LandmarkCache, video_fingerprint
+from pose_detector import NUM_LANDMARKS, PoseDetector
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+# One warm detector (and optional cache) per worker process, created by the pool initializer
+_worker_detector = None
+_worker_cache = None
+
+
+def _init_worker(options, cache_dir):
+    global _worker_detector, _worker_cache
+    _worker_detector = PoseDetector(**options)
+    _worker_cache = LandmarkCache(cache_dir) if cache_dir else None
+
+
+def _analyze_shard(path, start_frame, end_frame, chunk_size, fingerprint=None):
+    chunks = list(_worker_detector.process_video(
+        path, chunk_size, start_frame=start_frame, end_frame=end_frame, cache=_worker_cache,
+        fingerprint=fingerprint,
+    ))
+    if not chunks:
+        return path, start_frame, np.zeros(0), np.zeros((0, NUM_LANDMARKS, 4), dtype=np.float32)
+    timestamps = np.concatenate([c.timestamps for c in chunks])
+    landmarks = np.concatenate([c.landmarks for c in chunks])
+    return path, start_frame, timestamps, landmarks
+
+
+def find_videos(directory):
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+    )
+
+
+def count_frames(path):
+    cap = cv2.VideoCapture(path)
+    try:
+        return int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    finally:
+        cap.release()
+
+
+def plan_shards(paths, shard_frames):
+    # Split each video into (path, start, end) frame ranges of at most shard_frames. The
+    # container's frame count is only an estimate, so the last range reads to the end (None).
+    shards = []
+    for path in paths:
+        total = count_frames(path)
+        if total <= 0:
+            # Unknown length: let one worker read the whole file
+            shards.append((path, 0, None))
+            continue
+        for start in range(0, total, shard_frames):
+            end = start + shard_frames
+            shards.append((path, start, end if end < total else None))
+    return shards
+
+
+class BatchAnalyzer:
+    """Runs PoseDetector over many videos, or ranges of one long video, in a process pool."""
+
+    def __init__(self, workers=None, shard_frames=3000, chunk_size=256, detector_options=None, cache_dir=None):
+        self.workers = workers or os.cpu_count()
+        self.detector_options = detector_options or {}
+        self.cache_dir = cache_dir
+        self.shard_frames = shard_frames
+        self.chunk_size = chunk_size
+
+    def analyze(self, paths):
+        # Returns {path: (timestamps, landmarks)} with shards merged back in frame order
+        shards = plan_shards(paths, self.shard_frames)
+        parts = {path: [] for path in paths}
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(self.detector_options, self.cache_dir)
+        )
+        with pool:
+            # Hash each video once, in parallel, rather than once per shard in every worker
+            fingerprints = {}
+            if self.cache_dir:
+                fingerprints = dict(zip(paths, pool.map(video_fingerprint, paths)))
+            futures = [
+                pool.submit(_analyze_shard, path, start, end, self.chunk_size, fingerprints.get(path))
+                for path, start, end in shards
+            ]
+            for future in futures:
+                path, start, timestamps, landmarks = future.result()
+                parts[path].append((start, timestamps, landmarks))
+
+        results = {}
+        for path, shard_results in parts.items():
+            shard_results.sort(key=lambda part: part[0])
+            results[path] = (
+                np.concatenate([part[1] for part in shard_results]),
+                np.concatenate([part[2] for part in shard_results]),
+            )
+        return results
+
+    def analyze_directory(self, directory, output_dir=None):
+        # Writes one <video>.landmarks.npz per input video and returns the written paths
+        output_dir = output_dir or directory
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for path, (timestamps, landmarks) in self.analyze(find_videos(directory)).items():
+            name = os.path.splitext(os.path.basename(path))[0] + ".landmarks.npz"
+            out_path = os.path.join(output_dir, name)
+            np.savez(out_path, timestamps=timestamps, landmarks=landmarks)
+            written.append(out_path)
+        return written
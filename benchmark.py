@@ -0,0 +1,408 @@
+import json
+import os
+import platform
+import sys
+import time
+import timeit
+from types import SimpleNamespace
+
+import numpy as np
+
+import metrics
+from pose_detector import ANGLE_TRIPLETS, NUM_LANDMARKS, calculate_angles
+from posture_rules import RULES, score_posture
+
+# Offline micro-benchmarks for the detection and scoring paths.
+#
+#   python benchmark.py run --output baseline.json
+#   python benchmark.py run --output new.json --baseline baseline.json
+#   python benchmark.py compare baseline.json new.json
+#
+# Frames and landmarks are synthetic and seeded, so runs on the same machine are comparable.
+# Every timing is the median over several repeats of an auto-ranged loop.
+
+FORMAT_VERSION = 1
+RESOLUTIONS = ((320, 240), (640, 480), (1280, 720), (1920, 1080))
+BATCH_SIZES = (1, 32, 256, 2048)
+SEED = 1234
+
+# A person standing facing the camera, in normalized image coordinates (x, y)
+STANDING_POSE = np.array([
+    (0.50, 0.20),  # nose
+    (0.51, 0.18), (0.52, 0.18), (0.53, 0.18),  # left eye inner, eye, outer
+    (0.49, 0.18), (0.48, 0.18), (0.47, 0.18),  # right eye inner, eye, outer
+    (0.55, 0.19), (0.45, 0.19),  # ears
+    (0.52, 0.23), (0.48, 0.23),  # mouth
+    (0.60, 0.32), (0.40, 0.32),  # shoulders
+    (0.63, 0.45), (0.37, 0.45),  # elbows
+    (0.58, 0.55), (0.42, 0.55),  # wrists
+    (0.57, 0.57), (0.43, 0.57),  # pinkies
+    (0.57, 0.56), (0.43, 0.56),  # index fingers
+    (0.57, 0.55), (0.43, 0.55),  # thumbs
+    (0.56, 0.60), (0.44, 0.60),  # hips
+    (0.56, 0.75), (0.44, 0.75),  # knees
+    (0.56, 0.90), (0.44, 0.90),  # ankles
+    (0.57, 0.92), (0.43, 0.92),  # heels
+    (0.58, 0.94), (0.42, 0.94),  # foot index
+], dtype=np.float32)
+
+
+def synthetic_landmarks(count, rng, jitter=0.03):
+    """(count, 33, 4) landmarks scattered around a standing pose, some failing posture rules."""
+    landmarks = np.empty((count, NUM_LANDMARKS, 4), dtype=np.float32)
+    landmarks[:, :, :2] = STANDING_POSE + rng.normal(0, jitter, (count, NUM_LANDMARKS, 2))
+    landmarks[:, :, 2] = rng.normal(0, 0.1, (count, NUM_LANDMARKS))
+    landmarks[:, :, 3] = rng.uniform(0.5, 1.0, (count, NUM_LANDMARKS))
+    return landmarks
+
+
+def synthetic_frame(width, height, rng):
+    """BGR frame with a textured background and a stick figure in the standing pose."""
+    import cv2
+
+    gradient = np.linspace(40, 200, width, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = gradient[None, :, None]
+    frame += rng.integers(0, 24, frame.shape, dtype=np.uint8)
+    points = np.round(STANDING_POSE * (width, height)).astype(np.int32)
+    thickness = max(2, width // 60)
+    for a, b in ((11, 12), (11, 13), (13, 15), (12, 14), (14, 16), (11, 23), (12, 24),
+                 (23, 24), (23, 25), (25, 27), (24, 26), (26, 28)):
+        cv2.line(frame, tuple(points[a]), tuple(points[b]), (60, 90, 200), thickness, cv2.LINE_AA)
+    cv2.circle(frame, tuple(points[0]), max(4, width // 25), (150, 180, 220), cv2.FILLED, cv2.LINE_AA)
+    return frame
+
+
+def load_frames(directory):
+    # Sample images from a directory, in name order
+    import cv2
+
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        frame = cv2.imread(os.path.join(directory, name))
+        if frame is not None:
+            frames.append(frame)
+    if not frames:
+        raise SystemExit(f"No readable images in {directory}")
+    return frames
+
+
+def pose_results(landmarks):
+    # A MediaPipe-style results object, so landmark extraction and drawing run without inference
+    from mediapipe.framework.formats import landmark_pb2
+
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in landmarks.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return SimpleNamespace(pose_landmarks=landmark_list)
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Seconds per call of fn: median, min and max over `repeat` loops of at least min_time each."""
+    timer = timeit.Timer(fn)
+    fn()
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9) * 1.2))
+    samples = sorted(t / number for t in timer.repeat(repeat, number))
+    return {
+        "median": samples[len(samples) // 2],
+        "min": samples[0],
+        "max": samples[-1],
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+class BenchmarkSuite:
+    def __init__(self, resolutions=RESOLUTIONS, batch_sizes=BATCH_SIZES, repeat=5, min_time=0.2,
+                 frames=None, detector_options=None, log=None):
+        self.resolutions = resolutions
+        self.batch_sizes = batch_sizes
+        self.repeat = repeat
+        self.min_time = min_time
+        self.sample_frames = frames
+        self.detector_options = detector_options or {}
+        self.log = log or (lambda message: None)
+        self.results = []
+        self.skipped = []
+
+    def add(self, name, fn, items=1, **params):
+        timing = measure(fn, self.repeat, self.min_time)
+        timing["per_item"] = timing["median"] / items
+        self.results.append({"name": name, "params": params, **timing})
+        self.log(f"{name:<48} {timing['median'] * 1e3:10.4f} ms")
+
+    def skip(self, name, reason):
+        self.skipped.append({"name": name, "reason": reason})
+        self.log(f"{name:<48} skipped: {reason}")
+
+    def frames(self, width, height, count=8):
+        # A short looping clip at the given size, so tracking sees slightly different frames
+        import cv2
+
+        if self.sample_frames:
+            return [cv2.resize(f, (width, height), interpolation=cv2.INTER_AREA) for f in self.sample_frames]
+        rng = np.random.default_rng(SEED)
+        base = synthetic_frame(width, height, rng)
+        return [np.roll(base, shift, axis=1) for shift in range(0, count * 2, 2)]
+
+    def run(self):
+        # Profiling hooks stay off so they don't add to what is measured
+        metrics.enable(False)
+        self.run_scoring()
+        self.run_rendering()
+        self.run_detector()
+        return self.report()
+
+    def run_scoring(self):
+        rng = np.random.default_rng(SEED)
+        for batch in self.batch_sizes:
+            landmarks = synthetic_landmarks(batch, rng)
+            self.add(f"score_posture[batch={batch}]", lambda: score_posture(landmarks), batch, batch=batch)
+            self.add(
+                f"calculate_angles[batch={batch}]",
+                lambda: calculate_angles(landmarks, list(ANGLE_TRIPLETS.values()), image_size=(640, 480)),
+                batch, batch=batch,
+            )
+
+    def run_rendering(self):
+        # The skeleton renderer alone, without inference; every landmark visible and every rule failing
+        from skeleton_renderer import SkeletonRenderer
+
+        renderer = SkeletonRenderer()
+        landmarks = synthetic_landmarks(1, np.random.default_rng(SEED), jitter=0.0)[0]
+        landmarks[:, 3] = 1.0
+        failed = np.ones(len(RULES), dtype=bool)
+        for width, height in self.resolutions:
+            size = f"{width}x{height}"
+            canvas = self.frames(width, height, count=1)[0]
+            self.add(f"render_skeleton[{size}]", lambda: renderer.draw(canvas, landmarks), width=width, height=height)
+            self.add(
+                f"render_feedback[{size}]",
+                lambda: renderer.draw(canvas, landmarks, failed),
+                width=width, height=height,
+            )
+
+    def run_detector(self):
+        names = ["find_pose", "find_landmarks", "calculate_angle", "draw_landmarks"]
+        try:
+            import mediapipe as mp
+            from pose_detector import PoseDetector
+
+            detector = PoseDetector(**self.detector_options)
+        except Exception as e:
+            for name in names:
+                self.skip(name, f"PoseDetector unavailable ({type(e).__name__}: {e})")
+            return
+
+        try:
+            rng = np.random.default_rng(SEED)
+            results = pose_results(synthetic_landmarks(1, rng, jitter=0.0)[0])
+            for width, height in self.resolutions:
+                size = f"{width}x{height}"
+                frames = self.frames(width, height)
+                detected = self._detection_rate(detector, frames)
+                for draw in (False, True):
+                    frame_cycle = self._cycle([f.copy() for f in frames])
+                    self.add(
+                        f"find_pose[{size},draw={'on' if draw else 'off'}]",
+                        lambda: detector.find_pose(next(frame_cycle), draw),
+                        width=width, height=height, draw=draw, detection_rate=detected,
+                    )
+
+                # Landmark extraction, drawing and angles from fixed landmarks, independent of detection.
+                # draw_landmarks is MediaPipe's own drawing, as a reference for the skeleton renderer.
+                canvas = frames[0].copy()
+                detector.results = results
+                for draw in (False, True):
+                    self.add(
+                        f"find_landmarks[{size},draw={'on' if draw else 'off'}]",
+                        lambda: detector.find_landmarks(canvas, draw),
+                        width=width, height=height, draw=draw,
+                    )
+                self.add(
+                    f"draw_landmarks[{size}]",
+                    lambda: mp.solutions.drawing_utils.draw_landmarks(
+                        canvas, results.pose_landmarks, mp.solutions.pose.POSE_CONNECTIONS
+                    ),
+                    width=width, height=height,
+                )
+                self.add(
+                    f"calculate_angle[{size}]",
+                    lambda: detector.calculate_angle(11, 13, 15),
+                    width=width, height=height,
+                )
+        finally:
+            detector.close()
+
+    @staticmethod
+    def _cycle(frames):
+        while True:
+            yield from frames
+
+    @staticmethod
+    def _detection_rate(detector, frames):
+        found = 0
+        for frame in frames:
+            detector.find_pose(frame, draw=False)
+            found += detector.results.pose_landmarks is not None
+        return found / len(frames)
+
+    def report(self):
+        return {
+            "version": FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "environment": environment(),
+            "settings": {
+                "repeat": self.repeat,
+                "min_time": self.min_time,
+                "seed": SEED,
+                "frames": "samples" if self.sample_frames else "synthetic",
+                "detector_options": self.detector_options,
+            },
+            "results": self.results,
+            "skipped": self.skipped,
+        }
+
+
+def environment():
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+    try:
+        import cv2
+
+        info["opencv"] = cv2.__version__
+        info["opencv_threads"] = cv2.getNumThreads()
+    except ImportError:
+        pass
+    try:
+        import mediapipe
+
+        info["mediapipe"] = mediapipe.__version__
+    except ImportError:
+        pass
+    return info
+
+
+def compare(baseline, current, threshold=0.1):
+    """Match results by name; a median slower than baseline by more than `threshold` is a regression."""
+    previous = {r["name"]: r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"]
+        if ratio > 1 + threshold:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold):
+            status = "improvement"
+        else:
+            status = "ok"
+        rows.append({
+            "name": result["name"],
+            "baseline": before["median"],
+            "current": result["median"],
+            "ratio": ratio,
+            "status": status,
+        })
+    return rows
+
+
+def print_comparison(rows, baseline, current, out=sys.stdout):
+    changed = sorted(
+        key for key in set(baseline["environment"]) | set(current["environment"])
+        if baseline["environment"].get(key) != current["environment"].get(key)
+    )
+    if changed:
+        print(f"warning: environments differ in {', '.join(changed)}", file=out)
+    print(f"{'benchmark':<48} {'baseline ms':>12} {'current ms':>12} {'change':>8}", file=out)
+    for row in rows:
+        flag = {"regression": "  REGRESSION", "improvement": "  faster"}.get(row["status"], "")
+        print(
+            f"{row['name']:<48} {row['baseline'] * 1e3:12.4f} {row['current'] * 1e3:12.4f} "
+            f"{(row['ratio'] - 1) * 100:+7.1f}%{flag}",
+            file=out,
+        )
+    regressions = sum(row["status"] == "regression" for row in rows)
+    print(f"{len(rows)} compared, {regressions} regression(s)", file=out)
+    return regressions
+
+
+def _sizes(text):
+    return tuple(tuple(int(v) for v in size.split("x")) for size in text.split(","))
+
+
+def _ints(text):
+    return tuple(int(v) for v in text.split(","))
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python benchmark.py")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks and write the results as JSON")
+    run.add_argument("--output", default="benchmark.json", help="results file (default: benchmark.json)")
+    run.add_argument("--baseline", default=None, help="compare against this results file; exit 1 on regressions")
+    run.add_argument("--threshold", type=float, default=0.1, help="slowdown counted as a regression (default: 0.1 = 10%%)")
+    run.add_argument("--resolutions", type=_sizes, default=RESOLUTIONS, help="e.g. 640x480,1280x720")
+    run.add_argument("--batch-sizes", type=_ints, default=BATCH_SIZES, help="e.g. 1,32,256")
+    run.add_argument("--repeat", type=int, default=5, help="timing loops per benchmark (default: 5)")
+    run.add_argument("--min-time", type=float, default=0.2, help="minimum seconds per timing loop (default: 0.2)")
+    run.add_argument("--frames", default=None, help="directory of sample images to use instead of synthetic frames")
+    run.add_argument("--model-complexity", type=int, default=1)
+    run.add_argument("--inference-width", type=int, default=None)
+    run.add_argument("--threads", type=int, default=None, help="OpenCV threads; fix this for comparable runs")
+
+    comparison = commands.add_parser("compare", help="compare two results files; exit 1 on regressions")
+    comparison.add_argument("baseline")
+    comparison.add_argument("current")
+    comparison.add_argument("--threshold", type=float, default=0.1)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        return 1 if print_comparison(compare(baseline, current, args.threshold), baseline, current) else 0
+
+    if args.threads is not None:
+        import cv2
+
+        cv2.setNumThreads(args.threads)
+    suite = BenchmarkSuite(
+        resolutions=args.resolutions,
+        batch_sizes=args.batch_sizes,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        frames=load_frames(args.frames) if args.frames else None,
+        detector_options={"model_complexity": args.model_complexity, "inference_width": args.inference_width},
+        log=lambda message: print(message, file=sys.stderr),
+    )
+    report = suite.run()
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        return 1 if print_comparison(compare(baseline, report, args.threshold), baseline, report) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from pose_detector import PoseDetector
+
+# PoseDetector's default options
+DEFAULT_OPTIONS = {
+    "model_complexity": 1,
+    "smooth_landmarks": True,
+    "min_detection_confidence": 0.5,
+    "min_tracking_confidence": 0.5,
+    "inference_width": None,
+    "static_image_mode": False,
+}
+
+
+class DetectorPool:
+    """Process-wide pool of warm PoseDetectors, keyed by their options.
+
+    checkout() hands out an idle detector with matching options, or builds a new one, and
+    takes it back afterwards. Detectors left idle longer than idle_timeout are closed by
+    evict_idle(), except for the min_idle most recently used per key.
+    """
+
+    def __init__(self, idle_timeout=300.0, min_idle=1, factory=PoseDetector):
+        self.idle_timeout = idle_timeout
+        self.min_idle = min_idle
+        self.factory = factory
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _key(options):
+        merged = dict(DEFAULT_OPTIONS, **options)
+        return tuple(sorted(merged.items()))
+
+    def acquire(self, **options):
+        key = self._key(options)
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                return idle.pop()[1]
+        # Build outside the lock: loading the model graph is slow
+        detector = self.factory(**dict(key))
+        with self._lock:
+            self.created += 1
+        return detector
+
+    def release(self, detector, **options):
+        key = self._key(options)
+        with self._lock:
+            self._idle.setdefault(key, []).append((time.monotonic(), detector))
+
+    @contextmanager
+    def checkout(self, **options):
+        detector = self.acquire(**options)
+        try:
+            yield detector
+        finally:
+            self.release(detector, **options)
+
+    def warm(self, count=1, **options):
+        # Make sure at least `count` idle detectors with these options are ready
+        key = self._key(options)
+        with self._lock:
+            missing = count - len(self._idle.get(key, ()))
+        # Build new detectors directly: acquire() would hand back the idle ones first
+        for _ in range(max(missing, 0)):
+            detector = self.factory(**dict(key))
+            with self._lock:
+                self.created += 1
+            self.release(detector, **options)
+
+    def evict_idle(self, now=None):
+        now = time.monotonic() if now is None else now
+        expired = []
+        with self._lock:
+            for key, idle in self._idle.items():
+                # Idle lists are in release order, so the oldest entries come first
+                keep_from = max(len(idle) - self.min_idle, 0)
+                stale = [i for i, (released, _) in enumerate(idle[:keep_from]) if now - released > self.idle_timeout]
+                expired.extend(idle[i][1] for i in stale)
+                self._idle[key] = [entry for i, entry in enumerate(idle) if i not in stale]
+            self.evicted += len(expired)
+        for detector in expired:
+            detector.close()
+        return len(expired)
+
+    def idle_count(self):
+        with self._lock:
+            return sum(len(idle) for idle in self._idle.values())
+
+    def close(self):
+        with self._lock:
+            detectors = [detector for idle in self._idle.values() for _, detector in idle]
+            self._idle.clear()
+        for detector in detectors:
+            detector.close()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = DetectorPool()
+        return _default_pool
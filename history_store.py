@@ -0,0 +1,154 @@
+import sqlite3
+import threading
+import time
+
+from posture_rules import JS_NAMES, RULES
+
+# Weight of the newest session in the rolling average of correct posture
+ROLLING_ALPHA = 0.3
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    correct_time REAL NOT NULL,
+    incorrect_time REAL NOT NULL,
+    correct_percentage REAL NOT NULL,
+    {", ".join(f"fail_{rule} REAL NOT NULL DEFAULT 0" for rule in RULES)}
+);
+CREATE INDEX IF NOT EXISTS sessions_user_time ON sessions (user_id, timestamp, id);
+
+CREATE TABLE IF NOT EXISTS user_progress (
+    user_id TEXT PRIMARY KEY,
+    sessions_completed INTEGER NOT NULL,
+    total_practice_time REAL NOT NULL,
+    total_correct_time REAL NOT NULL,
+    total_incorrect_time REAL NOT NULL,
+    rolling_correct_percentage REAL NOT NULL,
+    last_correct_percentage REAL NOT NULL,
+    previous_correct_percentage REAL,
+    last_timestamp REAL NOT NULL,
+    {", ".join(f"fail_{rule} REAL NOT NULL DEFAULT 0" for rule in RULES)}
+);
+"""
+
+FAIL_COLUMNS = [f"fail_{rule}" for rule in RULES]
+
+
+class HistoryStore:
+    """SQLite-backed practice history with per-user aggregates updated on every insert.
+
+    Progress queries read one aggregate row and session listings use the (user, time)
+    index, so neither depends on how long a user's history is.
+    """
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def add_session(self, user_id, correct_time, incorrect_time, rule_failures=None, timestamp=None):
+        timestamp = time.time() if timestamp is None else timestamp
+        total = correct_time + incorrect_time
+        correct_percentage = correct_time / total * 100 if total > 0 else 0.0
+        failures = [float((rule_failures or {}).get(rule, 0.0)) for rule in RULES]
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO sessions (user_id, timestamp, correct_time, incorrect_time, correct_percentage, "
+                f"{', '.join(FAIL_COLUMNS)}) VALUES (?, ?, ?, ?, ?, {', '.join('?' * len(RULES))})",
+                (user_id, timestamp, correct_time, incorrect_time, correct_percentage, *failures),
+            )
+            self._conn.execute(
+                f"""
+                INSERT INTO user_progress (
+                    user_id, sessions_completed, total_practice_time, total_correct_time, total_incorrect_time,
+                    rolling_correct_percentage, last_correct_percentage, previous_correct_percentage,
+                    last_timestamp, {', '.join(FAIL_COLUMNS)}
+                ) VALUES (?, 1, ?, ?, ?, ?, ?, NULL, ?, {', '.join('?' * len(RULES))})
+                ON CONFLICT (user_id) DO UPDATE SET
+                    sessions_completed = sessions_completed + 1,
+                    total_practice_time = total_practice_time + excluded.total_practice_time,
+                    total_correct_time = total_correct_time + excluded.total_correct_time,
+                    total_incorrect_time = total_incorrect_time + excluded.total_incorrect_time,
+                    rolling_correct_percentage = rolling_correct_percentage
+                        + {ROLLING_ALPHA} * (excluded.rolling_correct_percentage - rolling_correct_percentage),
+                    previous_correct_percentage = last_correct_percentage,
+                    last_correct_percentage = excluded.last_correct_percentage,
+                    last_timestamp = excluded.last_timestamp,
+                    {', '.join(f'{c} = {c} + excluded.{c}' for c in FAIL_COLUMNS)}
+                """,
+                (user_id, total, correct_time, incorrect_time, correct_percentage, correct_percentage,
+                 timestamp, *failures),
+            )
+        return self.progress(user_id)
+
+    def progress(self, user_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM user_progress WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return {
+                "sessionsCompleted": 0,
+                "totalPracticeTime": 0.0,
+                "correctPercentage": 0.0,
+                "rollingCorrectPercentage": 0.0,
+                "lastCorrectPercentage": None,
+                "improvement": None,
+                "ruleFailureRates": {JS_NAMES[rule]: 0.0 for rule in RULES},
+            }
+        total = row["total_practice_time"]
+        previous = row["previous_correct_percentage"]
+        return {
+            "sessionsCompleted": row["sessions_completed"],
+            # Minutes, as shown in the progress panel
+            "totalPracticeTime": total / 60,
+            "correctPercentage": row["total_correct_time"] / total * 100 if total else 0.0,
+            "rollingCorrectPercentage": row["rolling_correct_percentage"],
+            "lastCorrectPercentage": row["last_correct_percentage"],
+            "improvement": None if previous is None else row["last_correct_percentage"] - previous,
+            # Share of practice time each rule was failing
+            "ruleFailureRates": {
+                JS_NAMES[rule]: row[f"fail_{rule}"] / total if total else 0.0 for rule in RULES
+            },
+        }
+
+    def sessions(self, user_id, start=None, end=None, before=None, limit=50):
+        # Newest first. Pass the last returned "cursor" as `before` to fetch the next page.
+        clauses = ["user_id = ?"]
+        params = [user_id]
+        if start is not None:
+            clauses.append("timestamp >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("timestamp < ?")
+            params.append(end)
+        if before is not None:
+            before_time, before_id = before
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend([before_time, before_id])
+        query = (
+            f"SELECT * FROM sessions WHERE {' AND '.join(clauses)} "
+            "ORDER BY timestamp DESC, id DESC LIMIT ?"
+        )
+        with self._lock:
+            rows = self._conn.execute(query, (*params, limit)).fetchall()
+        return [
+            {
+                "id": row["id"],
+                "timestamp": row["timestamp"],
+                "correctTime": row["correct_time"],
+                "incorrectTime": row["incorrect_time"],
+                "totalTime": row["correct_time"] + row["incorrect_time"],
+                "correctPercentage": row["correct_percentage"],
+                "ruleFailures": {JS_NAMES[rule]: row[f"fail_{rule}"] for rule in RULES},
+                "cursor": f"{row['timestamp']!r}:{row['id']}",
+            }
+            for row in rows
+        ]
+
+    def close(self):
+        self._conn.close()
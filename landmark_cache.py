@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+COLUMNS = ("x", "y", "z", "visibility")
+
+# Temporary files older than this are left over from a crashed put() and are removed
+STALE_TMP_SECONDS = 3600
+
+# Content hashes of video files, remembered per (path, size, mtime)
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+
+def video_fingerprint(path, block_size=1 << 20):
+    stat = os.stat(path)
+    memo_key = (os.path.realpath(path), stat.st_size, stat.st_mtime_ns)
+    with _fingerprints_lock:
+        if memo_key in _fingerprints:
+            return _fingerprints[memo_key]
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    fingerprint = digest.hexdigest()
+    with _fingerprints_lock:
+        _fingerprints[memo_key] = fingerprint
+    return fingerprint
+
+
+class LandmarkCache:
+    """On-disk cache of inferred landmarks for a video frame range.
+
+    Entries are keyed by the video's content hash, the exact frame range and the detector
+    options (a range only hits when requested again with the same boundaries, e.g. the same
+    shard size), and stored as one compressed .npz per range with a float16 column per landmark component
+    (about 1e-3 precision for normalized coordinates; pass dtype=np.float32 for exact values).
+    Files are written to a temporary name and renamed into place, so concurrent readers
+    (threads or processes) only ever see complete entries. Once the cache grows past
+    max_bytes, the least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, dtype=np.float16):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, path, options, start_frame=0, end_frame=None, fingerprint=None):
+        # Pass the video's fingerprint when it is already known; computing it reads the whole file
+        description = json.dumps(
+            {
+                "video": fingerprint or video_fingerprint(path),
+                "options": options,
+                "start": start_frame,
+                "end": end_frame,
+                "dtype": np.dtype(self.dtype).name,
+            },
+            sort_keys=True,
+        )
+        return hashlib.blake2b(description.encode(), digest_size=20).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key):
+        # Returns (timestamps, (N, 33, 4) landmarks) or None on a miss
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                timestamps = entry["timestamps"]
+                landmarks = np.stack([entry[column] for column in COLUMNS], axis=-1).astype(np.float32)
+            # Mark as recently used for eviction
+            os.utime(path)
+        except (FileNotFoundError, KeyError, ValueError, OSError):
+            return None
+        return timestamps, landmarks
+
+    def put(self, key, timestamps, landmarks):
+        columns = {column: landmarks[..., i].astype(self.dtype) for i, column in enumerate(COLUMNS)}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(f, timestamps=timestamps, **columns)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        now = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith((".npz", ".tmp")):
+                continue
+            try:
+                stat = entry.stat()
+                if entry.name.endswith(".tmp"):
+                    # In-progress writes count towards the size; abandoned ones are removed
+                    if now - stat.st_mtime > STALE_TMP_SECONDS:
+                        os.unlink(entry.path)
+                    else:
+                        total += stat.st_size
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        return removed
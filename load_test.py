@@ -0,0 +1,413 @@
+import asyncio
+import gzip
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Load generator for the web app: N simulated users each load the page and its static
+# assets, then stream synthetic traffic over a real-time endpoint while concurrency ramps.
+#
+#   python load_test.py --serve --ramp 1,10,50,100 --stream session
+#   python load_test.py http://127.0.0.1:8000 --stream frames --fps 10
+#
+# The client is single-threaded asyncio; if its CPU saturates, the numbers describe the
+# client rather than the server, so run it on a different core or machine for big ramps.
+
+ASSET_PATTERN = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+STREAMS = ("none", "session", "frames")
+# Ask for the encodings a browser would get, as far as this client can decode them
+ACCEPT_ENCODING = "gzip, br" if brotli is not None else "gzip"
+
+
+class StepStats:
+    """Counts and latencies for one concurrency level."""
+
+    def __init__(self, users):
+        self.users = users
+        self.http_latencies = []
+        self.http_errors = 0
+        self.frame_latencies = []
+        self.frames_sent = 0
+        self.frames_answered = 0
+        self.stream_errors = 0
+
+    def summary(self, elapsed):
+        http = np.array(self.http_latencies) * 1000
+        frames = np.array(self.frame_latencies) * 1000
+        requests = len(http) + self.http_errors
+        return {
+            "users": self.users,
+            "seconds": elapsed,
+            "http": {
+                "requests": requests,
+                "throughput": len(http) / elapsed,
+                "p50_ms": float(np.percentile(http, 50)) if len(http) else None,
+                "p99_ms": float(np.percentile(http, 99)) if len(http) else None,
+                "error_rate": self.http_errors / requests if requests else 0.0,
+            },
+            "stream": {
+                "frames_sent": self.frames_sent,
+                "throughput": self.frames_answered / elapsed,
+                "p50_ms": float(np.percentile(frames, 50)) if len(frames) else None,
+                "p99_ms": float(np.percentile(frames, 99)) if len(frames) else None,
+                # Frames the server coalesced or dropped instead of answering
+                "drop_rate": 1 - self.frames_answered / self.frames_sent if self.frames_sent else 0.0,
+                "errors": self.stream_errors,
+            },
+        }
+
+
+class HttpConnection:
+    # Minimal keep-alive HTTP/1.1 GET client; enough for the app's static responses
+    # and cheaper per request than a general-purpose client, so it can push harder.
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def get(self, path):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        self._writer.write(
+            f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Accept-Encoding: {ACCEPT_ENCODING}\r\n\r\n".encode()
+        )
+        try:
+            status_line = await self._reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed by server")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await self._reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            if status in (204, 304) or status < 200:
+                body = b""
+            elif "content-length" in headers:
+                body = await self._reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await self._reader.read()
+                self.close()
+            if headers.get("connection", "").lower() == "close":
+                self.close()
+        except Exception:
+            self.close()
+            raise
+        return status, headers, body
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def decode_body(headers, body):
+    # The response body with its Content-Encoding undone
+    encoding = headers.get("content-encoding", "identity").lower()
+    try:
+        if encoding == "gzip":
+            return gzip.decompress(body)
+        if encoding == "br" and brotli is not None:
+            return brotli.decompress(body)
+    except Exception as e:
+        raise ValueError(f"could not decode {encoding} body: {e}") from None
+    if encoding != "identity":
+        raise ValueError(f"unsupported content encoding: {encoding}")
+    return body
+
+
+class LoadTest:
+    def __init__(self, url, stream="session", fps=15.0, binary=True, frame_size=(640, 480), record=False,
+                 log=None):
+        parts = urlsplit(url)
+        self.url = url.rstrip("/")
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.ws_url = ("wss" if parts.scheme == "https" else "ws") + f"://{self.host}:{self.port}"
+        self.stream = stream
+        self.fps = fps
+        self.binary = binary
+        self.frame_size = frame_size
+        self.record = record
+        self.log = log or (lambda message: None)
+        self._landmarks = None
+        self._image = None
+        # With record=True sessions are saved server-side like a browser's; keep each run's files apart
+        self.run_id = time.strftime("%Y%m%d-%H%M%S")
+
+    def _prepare(self):
+        # Synthetic traffic, shared by all users
+        from benchmark import SEED, synthetic_frame, synthetic_landmarks
+
+        rng = np.random.default_rng(SEED)
+        if self.stream == "session":
+            self._landmarks = synthetic_landmarks(256, rng, jitter=0.01)
+        elif self.stream == "frames":
+            import cv2
+
+            ok, encoded = cv2.imencode(".jpg", synthetic_frame(*self.frame_size, rng), [cv2.IMWRITE_JPEG_QUALITY, 70])
+            self._image = encoded.tobytes()
+
+    async def load_page(self, stats, http):
+        # The landing page, then every /static asset it references
+        start = time.perf_counter()
+        try:
+            status, headers, body = await http.get("/")
+            if status != 200:
+                raise ConnectionError(f"HTTP {status}")
+            # The page arrives compressed; assets are timed but not decoded
+            body = decode_body(headers, body)
+        except (OSError, ConnectionError, ValueError, IndexError, asyncio.IncompleteReadError):
+            stats.http_errors += 1
+            return
+        stats.http_latencies.append(time.perf_counter() - start)
+        for path in dict.fromkeys(ASSET_PATTERN.findall(body.decode("utf-8", "replace"))):
+            start = time.perf_counter()
+            try:
+                status, _, _ = await http.get(path)
+                if status != 200:
+                    raise ConnectionError(f"HTTP {status}")
+            except (OSError, ConnectionError, ValueError, IndexError, asyncio.IncompleteReadError):
+                stats.http_errors += 1
+                continue
+            stats.http_latencies.append(time.perf_counter() - start)
+
+    async def user(self, index, stats, deadline):
+        http = HttpConnection(self.host, self.port)
+        try:
+            await self.load_page(stats, http)
+            if self.stream == "none":
+                # Static-only users keep reloading the page
+                while time.monotonic() < deadline:
+                    await self.load_page(stats, http)
+            elif self.stream == "session":
+                await self.stream_session(index, stats, deadline)
+            else:
+                await self.stream_frames(stats, deadline)
+        finally:
+            http.close()
+
+    async def stream_session(self, index, stats, deadline):
+        # Landmarks to /ws/session; replies echo the frame time, so latency is exact
+        import websockets
+        from wire_format import encode_frame
+
+        sent_at = {}
+        url = f"{self.ws_url}/ws/session"
+        if self.record:
+            url += f"?session=load-{self.run_id}-{index}"
+        try:
+            async with websockets.connect(url) as ws:
+                async def receive():
+                    async for message in ws:
+                        result = json.loads(message)
+                        if "error" in result:
+                            stats.stream_errors += 1
+                            continue
+                        start = sent_at.pop(round(result["t"]), None)
+                        if start is not None:
+                            stats.frames_answered += 1
+                            stats.frame_latencies.append(time.perf_counter() - start)
+
+                receiver = asyncio.create_task(receive())
+                previous = None
+                last_t = 0
+                frame = index
+                try:
+                    async for _ in self._ticks(deadline):
+                        # Whole, strictly increasing epoch milliseconds identify each frame
+                        t = max(int(time.time() * 1000), last_t + 1)
+                        last_t = t
+                        landmarks = self._landmarks[frame % len(self._landmarks)]
+                        frame += 1
+                        if self.binary:
+                            data, previous = encode_frame(landmarks, t, previous)
+                        else:
+                            data = json.dumps({"t": t, "landmarks": landmarks.tolist()})
+                        sent_at[t] = time.perf_counter()
+                        await ws.send(data)
+                        stats.frames_sent += 1
+                    # Let in-flight replies arrive before closing
+                    await asyncio.sleep(0.2)
+                finally:
+                    receiver.cancel()
+        except (OSError, websockets.WebSocketException):
+            stats.stream_errors += 1
+
+    async def stream_frames(self, stats, deadline):
+        # JPEG frames to /ws/frames. Replies carry no frame id, but the server only ever
+        # processes the newest frame, so reply n answers frame n + dropped - 1.
+        import websockets
+
+        sent_at = []
+        try:
+            async with websockets.connect(f"{self.ws_url}/ws/frames") as ws:
+                async def receive():
+                    answered = 0
+                    async for message in ws:
+                        result = json.loads(message)
+                        if "error" in result:
+                            stats.stream_errors += 1
+                            continue
+                        answered += 1
+                        index = answered + result.get("dropped", 0) - 1
+                        if index < len(sent_at):
+                            stats.frames_answered += 1
+                            stats.frame_latencies.append(time.perf_counter() - sent_at[index])
+
+                receiver = asyncio.create_task(receive())
+                try:
+                    async for _ in self._ticks(deadline):
+                        sent_at.append(time.perf_counter())
+                        await ws.send(self._image)
+                        stats.frames_sent += 1
+                    await asyncio.sleep(0.5)
+                finally:
+                    receiver.cancel()
+        except (OSError, websockets.WebSocketException):
+            stats.stream_errors += 1
+
+    async def _ticks(self, deadline):
+        # Fixed-rate schedule; a late tick is not made up for with a burst
+        interval = 1.0 / self.fps
+        next_tick = time.monotonic()
+        while next_tick < deadline:
+            yield
+            next_tick = max(next_tick + interval, time.monotonic())
+            await asyncio.sleep(next_tick - time.monotonic())
+
+    async def run_step(self, users, duration):
+        stats = StepStats(users)
+        start = time.monotonic()
+        deadline = start + duration
+        tasks = [asyncio.create_task(self.user(i, stats, deadline)) for i in range(users)]
+        for task in asyncio.as_completed(tasks):
+            try:
+                await task
+            except Exception as e:
+                stats.stream_errors += 1
+                self.log(f"user failed: {type(e).__name__}: {e}")
+        return stats.summary(time.monotonic() - start)
+
+    async def ramp(self, levels, duration):
+        self._prepare()
+        steps = []
+        for users in levels:
+            step = await self.run_step(users, duration)
+            steps.append(step)
+            self.log(format_step(step))
+        return steps
+
+
+def format_step(step):
+    def ms(value):
+        return f"{value:8.1f}" if value is not None else "       -"
+
+    http, stream = step["http"], step["stream"]
+    return (
+        f"{step['users']:6d} users | http {http['throughput']:8.1f}/s p50 {ms(http['p50_ms'])} "
+        f"p99 {ms(http['p99_ms'])} err {http['error_rate']:6.1%} | stream {stream['throughput']:8.1f}/s "
+        f"p50 {ms(stream['p50_ms'])} p99 {ms(stream['p99_ms'])} drop {stream['drop_rate']:6.1%} "
+        f"err {stream['errors']}"
+    )
+
+
+def max_users_within(steps, p99_ms, max_drop_rate):
+    # Largest tested concurrency whose latency, drop and error rates all stayed within bounds
+    best = None
+    for step in steps:
+        http, stream = step["http"], step["stream"]
+        latency = stream["p99_ms"] if stream["frames_sent"] else http["p99_ms"]
+        if (latency is not None and latency <= p99_ms and stream["drop_rate"] <= max_drop_rate
+                and not stream["errors"] and not http["error_rate"]):
+            best = step["users"] if best is None else max(best, step["users"])
+    return best
+
+
+def wait_for_server(url, timeout=30.0):
+    import urllib.request
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url + "/", timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python load_test.py")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8000")
+    parser.add_argument("--ramp", default="1,5,10,25,50", help="concurrent users per step (default: 1,5,10,25,50)")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds per step (default: 15)")
+    parser.add_argument("--stream", choices=STREAMS, default="session",
+                        help="real-time traffic per user after loading the page (default: session)")
+    parser.add_argument("--fps", type=float, default=15.0, help="frames per second per user (default: 15)")
+    parser.add_argument("--json-frames", action="store_true", help="send /ws/session landmarks as JSON instead of binary")
+    parser.add_argument("--record", action="store_true",
+                        help="record each user's --stream session frames in the server's session store")
+    parser.add_argument("--frame-size", default="640x480", help="JPEG size for --stream frames (default: 640x480)")
+    parser.add_argument("--output", default=None, help="also write the results as JSON")
+    parser.add_argument("--slo-p99", type=float, default=None,
+                        help="report the most users whose p99 latency (ms) stayed under this")
+    parser.add_argument("--max-drop-rate", type=float, default=0.2, help="drop rate allowed with --slo-p99 (default: 0.2)")
+    parser.add_argument("--serve", action="store_true", help="start a local uvicorn for the app at the given url")
+
+    args = parser.parse_args(argv)
+    server = None
+    if args.serve:
+        port = urlsplit(args.url).port or 8000
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+    try:
+        if server is not None:
+            wait_for_server(args.url.rstrip("/"))
+        test = LoadTest(
+            args.url,
+            stream=args.stream,
+            fps=args.fps,
+            binary=not args.json_frames,
+            frame_size=tuple(int(v) for v in args.frame_size.split("x")),
+            record=args.record,
+            log=print,
+        )
+        steps = asyncio.run(test.ramp([int(v) for v in args.ramp.split(",")], args.duration))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.slo_p99 is not None:
+        users = max_users_within(steps, args.slo_p99, args.max_drop_rate)
+        print(f"max users within p99 {args.slo_p99:g} ms: {users if users is not None else 'none of the tested levels'}")
+    if args.output:
+        settings = {k: v for k, v in vars(args).items() if k != "output"}
+        with open(args.output, "w") as f:
+            json.dump({"settings": settings, "steps": steps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,526 +1,399 @@
-from fastapi import FastAPI
-from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+from fastapi import FastAPI, HTTPException, Path, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, confloat
+import asyncio
+import json
+import logging
 import os
+import time
 
-app = FastAPI()
+import metrics
+from static_assets import StaticAssets
+from streaming import LatestSlot
+
+# numpy, cv2, mediapipe and the modules built on them are imported inside the handlers
+# that need them, so serving the static app does not pay for loading them.
+
+logger = logging.getLogger(__name__)
+
+# Number of PoseDetectors to load in the background at startup (0 disables it)
+POSE_PREWARM = int(os.environ.get("POSE_PREWARM", "1"))
+# Downscale frames wider than this before server-side inference (unset: full resolution)
+POSE_INFERENCE_WIDTH = int(os.environ.get("POSE_INFERENCE_WIDTH", "0")) or None
+DETECTOR_OPTIONS = {"inference_width": POSE_INFERENCE_WIDTH}
+# Where recorded sessions and history are kept
+DATA_DIR = os.environ.get("DATA_DIR", "data")
+# Seconds between flushes of recorded session frames to disk
+SESSION_FLUSH_INTERVAL = 1.0
+# How often idle pooled detectors are checked for eviction, in seconds
+POOL_EVICT_INTERVAL = 60
+# Latency budget for /ws/frames: frames not in inference this many seconds after arriving are dropped
+FRAME_DEADLINE = float(os.environ.get("POSE_FRAME_DEADLINE_MS", "500")) / 1000
+# Re-read changed static files on request (for development; assets are otherwise loaded once)
+STATIC_RELOAD = os.environ.get("POSE_STATIC_RELOAD", "") not in ("", "0")
+
+def warm_detectors(count):
+    from detector_pool import get_pool
+
+    try:
+        get_pool().warm(count, **DETECTOR_OPTIONS)
+    except Exception:
+        logger.exception("Failed to pre-warm pose detectors")
+
+async def evict_idle_detectors():
+    from detector_pool import get_pool
+
+    while True:
+        await asyncio.sleep(POOL_EVICT_INTERVAL)
+        await asyncio.get_running_loop().run_in_executor(None, get_pool().evict_idle)
+
+@asynccontextmanager
+async def lifespan(app):
+    loop = asyncio.get_running_loop()
+    if POSE_PREWARM > 0:
+        # Not awaited: the app starts serving while the model graph loads
+        loop.run_in_executor(None, warm_detectors, POSE_PREWARM)
+    evictor = asyncio.create_task(evict_idle_detectors())
+    yield
+    evictor.cancel()
+    if history_store is not None:
+        history_store.close()
+    if frame_scheduler is not None:
+        frame_scheduler.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Create a static directory if it doesn't exist
 os.makedirs("static", exist_ok=True)
 
-# Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-@app.get("/")
-async def read_root():
-    return FileResponse('index.html')
-
-html = """
-<!DOCTYPE html>
-<html>
-    <head>
-        <title>Pose Tracking</title>
-        <script src=\"https://cdn.jsdelivr.net/npm/@tensorflow/tfjs@4.18.0/dist/tf.min.js\"></script>
-        <script src=\"https://cdn.jsdelivr.net/npm/@mediapipe/pose@0.5.1675469242/pose.js\"></script>
-        <script src=\"https://cdn.jsdelivr.net/npm/@mediapipe/drawing_utils@0.5.1675469242/drawing_utils.js\"></script>
-        <script src=\"https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js\"></script>
-        <style>
-            body {
-                font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                background-color: #f5f5f5;
-                margin: 0;
-                padding: 20px;
-                color: #333;
-            }
-            
-            h1 {
-                text-align: center;
-                color: #2c3e50;
-                margin-bottom: 20px;
-            }
-            
-            .container {
-                display: flex;
-                flex-wrap: wrap;
-                justify-content: center;
-                gap: 20px;
-                max-width: 1200px;
-                margin: 0 auto;
-            }
-            
-            .video-container {
-                position: relative;
-                width: 640px;
-                height: 480px;
-            }
-            
-            #video, #output { 
-                position: absolute; 
-                top: 0; 
-                left: 0; 
-                border-radius: 10px;
-                box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1);
-            }
-            
-            #output { 
-                z-index: 10; 
-                pointer-events: none; 
-            }
-            
-            #feedback { 
-                position: absolute; 
-                top: 10px; 
-                left: 10px; 
-                font-size: 1.5em; 
-                color: green; 
-                z-index: 20; 
-                background-color: rgba(255, 255, 255, 0.7);
-                padding: 5px 10px;
-                border-radius: 5px;
-                max-width: 80%;
-                text-shadow: 1px 1px 1px rgba(0, 0, 0, 0.1);
-            }
-            
-            .stats-container {
-                display: flex;
-                flex-direction: column;
-                gap: 20px;
-                width: 400px;
-            }
-            
-            #chart-container { 
-                width: 100%;
-                height: 320px; 
-                background: #fff; 
-                border-radius: 10px; 
-                box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1); 
-                padding: 15px;
-                box-sizing: border-box;
-                display: none;
-            }
-            
-            #stats { 
-                width: 100%;
-                font-size: 1em; 
-                background: #fff; 
-                border-radius: 10px; 
-                box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1); 
-                padding: 15px; 
-                box-sizing: border-box;
-                display: none;
-                line-height: 1.5;
-            }
-            
-            #stats h3 {
-                color: #2c3e50;
-                border-bottom: 1px solid #eee;
-                padding-bottom: 5px;
-            }
-            
-            #stats ul li {
-                margin-bottom: 5px;
-            }
-            
-            @media (max-width: 1100px) {
-                .container {
-                    flex-direction: column;
-                    align-items: center;
-                }
-                
-                .stats-container {
-                    width: 640px;
-                }
-            }
-        </style>
-    </head>
-    <body>
-        <h1>Real-time Pose Tracking for Presentation Practice</h1>
-        
-        <div class=\"container\">
-            <div class=\"video-container\">
-                <video id=\"video\" width=\"640\" height=\"480\" autoplay muted playsinline style=\"display:none;\"></video>
-                <canvas id=\"output\" width=\"640\" height=\"480\"></canvas>
-                <div id=\"feedback\"></div>
-            </div>
-            
-            <div class=\"stats-container\">
-                <div id=\"chart-container\">
-                    <canvas id=\"piechart\"></canvas>
-                </div>
-                <div id=\"stats\"></div>
-                
-                <div id=\"history-container\" style=\"background: #fff; border-radius: 10px; box-shadow: 0 4px 15px rgba(0, 0, 0, 0.1); padding: 15px; box-sizing: border-box;\">
-                    <h3 style=\"color: #2c3e50; border-bottom: 1px solid #eee; padding-bottom: 5px;\">Your Progress</h3>
-                    <p>Practice regularly to see your improvement over time. The application tracks your progress across sessions.</p>
-                    <div id=\"progress-stats\">
-                        <p>Sessions completed: <span id=\"sessions-count\">0</span></p>
-                        <p>Total practice time: <span id=\"total-practice-time\">0</span> minutes</p>
-                    </div>
-                </div>
-            </div>
-        </div>
-        <script>
-            const video = document.getElementById('video');
-            const canvas = document.getElementById('output');
-            const ctx = canvas.getContext('2d');
-            const feedbackDiv = document.getElementById('feedback');
-            const chartContainer = document.getElementById('chart-container');
-            const statsDiv = document.getElementById('stats');
-            const sessionsCountElement = document.getElementById('sessions-count');
-            const totalPracticeTimeElement = document.getElementById('total-practice-time');
-            
-            // Tracking variables
-            let correctFrames = 0, incorrectFrames = 0, totalFrames = 0;
-            let correctTime = 0, incorrectTime = 0;
-            let lastChartTime = Date.now();
-            let pieChart = null;
-            
-            // Load progress data from localStorage
-            let progressData = {
-                sessionsCompleted: 0,
-                totalPracticeTime: 0 // in minutes
-            };
-            
-            // Try to load existing progress data
-            try {
-                const savedProgressData = localStorage.getItem('presentationProgressData');
-                if (savedProgressData) {
-                    progressData = JSON.parse(savedProgressData);
-                }
-                
-                // Update UI with loaded data
-                updateProgressDisplay();
-            } catch (e) {
-                console.error('Error loading progress data:', e);
-            }
-            
-            // Function to update progress display
-            function updateProgressDisplay() {
-                sessionsCountElement.textContent = progressData.sessionsCompleted;
-                totalPracticeTimeElement.textContent = progressData.totalPracticeTime.toFixed(1);
-            }
-
-            async function setupCamera() {
-                const stream = await navigator.mediaDevices.getUserMedia({ video: true });
-                video.srcObject = stream;
-                return new Promise((resolve) => {
-                    video.onloadedmetadata = () => { resolve(video); };
-                });
-            }
-
-            function calculateAngle(a, b, c) {
-                // a, b, c are {x, y}
-                const radians = Math.atan2(c.y - b.y, c.x - b.x) - Math.atan2(a.y - b.y, a.x - b.x);
-                let angle = Math.abs(radians * 180.0 / Math.PI);
-                if (angle > 180) angle = 360 - angle;
-                return angle;
-            }
-
-            function isBodyLanguageCorrect(lm) {
-                // Comprehensive rules for correct presentation body language:
-                // 1. Standing upright: shoulders and hips aligned vertically
-                // 2. Arms positioned appropriately (not crossed, good gesturing position)
-                // 3. Head facing forward
-                // 4. No slouching (back straight)
-                // 5. Weight balanced on both feet
-                // 6. Proper hand gestures (not hidden, not fidgeting)
-                // 7. Shoulders relaxed, not hunched
-                
-                // Check if key landmarks are detected
-                if (!lm[11] || !lm[12] || !lm[23] || !lm[24] || !lm[0] || !lm[15] || !lm[16] || !lm[27] || !lm[28]) {
-                    return { isCorrect: false, feedback: "Move fully into camera view" };
-                }
-                
-                // Extract key landmarks
-                const nose = lm[0];
-                const leftShoulder = lm[11], rightShoulder = lm[12];
-                const leftElbow = lm[13], rightElbow = lm[14];
-                const leftWrist = lm[15], rightWrist = lm[16];
-                const leftHip = lm[23], rightHip = lm[24];
-                const leftKnee = lm[25], rightKnee = lm[26];
-                const leftAnkle = lm[27], rightAnkle = lm[28];
-                
-                // Calculate midpoints
-                const shoulderMidX = (leftShoulder.x + rightShoulder.x) / 2;
-                const hipMidX = (leftHip.x + rightHip.x) / 2;
-                
-                // 1. Posture checks
-                const shouldersAligned = Math.abs(leftShoulder.y - rightShoulder.y) < 0.08;
-                const hipsAligned = Math.abs(leftHip.y - rightHip.y) < 0.08;
-                const backStraight = Math.abs(shoulderMidX - hipMidX) < 0.08;
-                
-                // 2. Head position
-                const headCentered = (nose.x > Math.min(leftShoulder.x, rightShoulder.x)) && 
-                                    (nose.x < Math.max(leftShoulder.x, rightShoulder.x));
-                const headUpright = nose.y < Math.min(leftShoulder.y, rightShoulder.y);
-                
-                // 3. Arm position
-                const armsNotCrossed = Math.abs(leftWrist.x - rightWrist.x) > 0.15;
-                const armsInGesturingPosition = (leftWrist.y > leftElbow.y) && (rightWrist.y > rightElbow.y) && 
-                                               (leftWrist.y < leftHip.y) && (rightWrist.y < rightHip.y);
-                
-                // 4. Weight distribution
-                const weightBalanced = Math.abs(leftAnkle.y - rightAnkle.y) < 0.05 && 
-                                      Math.abs(leftKnee.y - rightKnee.y) < 0.05;
-                
-                // 5. Shoulder relaxation
-                const shouldersRelaxed = (leftShoulder.y < leftElbow.y) && (rightShoulder.y < rightElbow.y);
-                
-                // Compile feedback
-                let feedbackItems = [];
-                if (!shouldersAligned || !shouldersRelaxed) feedbackItems.push("Relax and level your shoulders");
-                if (!hipsAligned || !weightBalanced) feedbackItems.push("Balance your weight evenly");
-                if (!backStraight) feedbackItems.push("Stand up straight");
-                if (!headCentered || !headUpright) feedbackItems.push("Center your head and look forward");
-                if (!armsNotCrossed) feedbackItems.push("Uncross your arms");
-                if (!armsInGesturingPosition) feedbackItems.push("Position arms for natural gesturing");
-                
-                // Overall assessment
-                const isCorrect = shouldersAligned && hipsAligned && backStraight && 
-                                 headCentered && headUpright && armsNotCrossed && 
-                                 armsInGesturingPosition && weightBalanced && shouldersRelaxed;
-                
-                return { 
-                    isCorrect: isCorrect, 
-                    feedback: isCorrect ? "Great presentation posture!" : feedbackItems.join(" & ")
-                };
-            }
-
-            async function main() {
-                await setupCamera();
-                video.play();
-
-                const poseInstance = new pose.Pose({
-                    locateFile: (file) => `https://cdn.jsdelivr.net/npm/@mediapipe/pose@0.5.1675469242/${file}`
-                });
-                poseInstance.setOptions({
-                    modelComplexity: 1,
-                    smoothLandmarks: true,
-                    enableSegmentation: false,
-                    minDetectionConfidence: 0.5,
-                    minTrackingConfidence: 0.5
-                });
-
-                poseInstance.onResults(onResults);
-
-                async function detect() {
-                    await poseInstance.send({image: video});
-                    requestAnimationFrame(detect);
-                }
-                detect();
-            }
-
-            // Store session history for tracking improvement over time
-            let sessionHistory = [];
-            let sessionStartTime = Date.now();
-            
-            function onResults(results) {
-                ctx.clearRect(0, 0, canvas.width, canvas.height);
-                ctx.drawImage(results.image, 0, 0, canvas.width, canvas.height);
-                
-                if (results.poseLandmarks) {
-                    // Draw pose landmarks
-                    window.drawConnectors(ctx, results.poseLandmarks, pose.POSE_CONNECTIONS, {color: '#00FF00', lineWidth: 4});
-                    window.drawLandmarks(ctx, results.poseLandmarks, {color: '#FF0000', lineWidth: 2});
-                    
-                    // Check body language with detailed feedback
-                    const lm = results.poseLandmarks;
-                    const bodyLanguageResult = isBodyLanguageCorrect(lm);
-                    
-                    if (bodyLanguageResult.isCorrect) {
-                        feedbackDiv.style.color = 'green';
-                        correctFrames++;
-                    } else {
-                        feedbackDiv.style.color = 'red';
-                        incorrectFrames++;
-                    }
-                    
-                    feedbackDiv.textContent = bodyLanguageResult.feedback;
-                    totalFrames++;
-                    
-                    // Draw specific feedback annotations on the canvas
-                    drawBodyLanguageFeedback(ctx, results.poseLandmarks, bodyLanguageResult);
-                } else {
-                    feedbackDiv.textContent = 'No pose detected';
-                }
-                
-                // Every 5 minutes (300000 ms), show pie chart and stats
-                const now = Date.now();
-                if (now - lastChartTime > 300000 && totalFrames > 0) {
-                    // Calculate time in seconds (assuming ~30 FPS)
-                    correctTime = correctFrames * (1/30);
-                    incorrectTime = incorrectFrames * (1/30);
-                    
-                    // Store session data for tracking improvement
-                    const sessionData = {
-                        timestamp: now,
-                        correctPercentage: (correctFrames / totalFrames) * 100,
-                        correctTime: correctTime,
-                        incorrectTime: incorrectTime,
-                        totalTime: correctTime + incorrectTime
-                    };
-                    sessionHistory.push(sessionData);
-                    
-                    // Save session history to localStorage for persistence
-                    localStorage.setItem('presentationSessionHistory', JSON.stringify(sessionHistory));
-                    
-                    // Show updated pie chart and stats
-                    showPieChart();
-                    lastChartTime = now;
-                }
-            }
-            
-            // Function to draw specific feedback on the canvas
-            function drawBodyLanguageFeedback(ctx, landmarks, bodyLanguageResult) {
-                if (!bodyLanguageResult.isCorrect) {
-                    // Draw feedback indicators based on specific issues
-                    const feedback = bodyLanguageResult.feedback;
-                    
-                    // Highlight problematic areas with colored circles
-                    if (feedback.includes("shoulders")) {
-                        highlightLandmarks(ctx, [landmarks[11], landmarks[12]], 'yellow');
-                    }
-                    
-                    if (feedback.includes("straight") || feedback.includes("posture")) {
-                        // Draw line from shoulders to hips to show alignment
-                        const shoulderMidX = (landmarks[11].x + landmarks[12].x) / 2;
-                        const shoulderMidY = (landmarks[11].y + landmarks[12].y) / 2;
-                        const hipMidX = (landmarks[23].x + landmarks[24].x) / 2;
-                        const hipMidY = (landmarks[23].y + landmarks[24].y) / 2;
-                        
-                        ctx.beginPath();
-                        ctx.moveTo(shoulderMidX * canvas.width, shoulderMidY * canvas.height);
-                        ctx.lineTo(hipMidX * canvas.width, hipMidY * canvas.height);
-                        ctx.strokeStyle = 'yellow';
-                        ctx.lineWidth = 3;
-                        ctx.stroke();
-                    }
-                    
-                    if (feedback.includes("arms")) {
-                        highlightLandmarks(ctx, [landmarks[13], landmarks[14], landmarks[15], landmarks[16]], 'orange');
-                    }
-                    
-                    if (feedback.includes("head")) {
-                        highlightLandmarks(ctx, [landmarks[0]], 'cyan');
-                    }
-                    
-                    if (feedback.includes("weight") || feedback.includes("balance")) {
-                        highlightLandmarks(ctx, [landmarks[27], landmarks[28]], 'magenta');
-                    }
-                }
-            }
-            
-            // Helper function to highlight specific landmarks
-            function highlightLandmarks(ctx, landmarkArray, color) {
-                landmarkArray.forEach(landmark => {
-                    ctx.beginPath();
-                    ctx.arc(landmark.x * canvas.width, landmark.y * canvas.height, 15, 0, 2 * Math.PI);
-                    ctx.strokeStyle = color;
-                    ctx.lineWidth = 3;
-                    ctx.stroke();
-                });
-            }
-
-            function showPieChart() {
-                chartContainer.style.display = 'block';
-                statsDiv.style.display = 'block';
-                
-                // Calculate percentages for pie chart
-                const correctPercentage = (correctFrames / totalFrames) * 100;
-                const incorrectPercentage = (incorrectFrames / totalFrames) * 100;
-                
-                // Create pie chart data
-                const data = {
-                    labels: ['Correct Posture', 'Incorrect Posture'],
-                    datasets: [{
-                        data: [correctPercentage, incorrectPercentage],
-                        backgroundColor: ['#4caf50', '#f44336'],
-                    }]
-                };
-                
-                // Update or create pie chart
-                if (pieChart) pieChart.destroy();
-                pieChart = new Chart(document.getElementById('piechart'), {
-                    type: 'pie',
-                    data: data,
-                    options: {
-                        plugins: {
-                            legend: { display: true, position: 'bottom' },
-                            title: { display: true, text: 'Body Language Analysis (last 5 min)' },
-                            tooltip: {
-                                callbacks: {
-                                    label: function(context) {
-                                        return `${context.label}: ${context.raw.toFixed(1)}%`;
-                                    }
-                                }
-                            }
-                        },
-                        responsive: true,
-                        maintainAspectRatio: false
-                    }
-                });
-                
-                // Load previous session data from localStorage
-                let previousSessions = [];
-                try {
-                    const savedData = localStorage.getItem('presentationSessionHistory');
-                    if (savedData) {
-                        previousSessions = JSON.parse(savedData);
-                    }
-                } catch (e) {
-                    console.error('Error loading previous session data:', e);
-                }
-                
-                // Calculate improvement metrics
-                let improvementText = '';
-                if (previousSessions.length > 1) {
-                    const currentSession = previousSessions[previousSessions.length - 1];
-                    const previousSession = previousSessions[previousSessions.length - 2];
-                    
-                    const percentageChange = currentSession.correctPercentage - previousSession.correctPercentage;
-                    const improvementDirection = percentageChange >= 0 ? 'improved' : 'decreased';
-                    
-                    improvementText = `<div style="margin-top: 10px; padding: 8px; background: ${percentageChange >= 0 ? '#e8f5e9' : '#ffebee'}; border-radius: 5px;">
-                        <b>Improvement:</b> Your correct posture has ${improvementDirection} by ${Math.abs(percentageChange).toFixed(1)}% since last session
-                    </div>`;
-                }
-                
-                // Update stats display with detailed information
-                statsDiv.innerHTML = `
-                    <div style="margin-bottom: 10px;">
-                        <h3 style="margin: 5px 0;">Current Session (5 min)</h3>
-                        <div><b>Correct posture:</b> ${correctTime.toFixed(1)}s (${correctPercentage.toFixed(1)}%)</div>
-                        <div><b>Incorrect posture:</b> ${incorrectTime.toFixed(1)}s (${incorrectPercentage.toFixed(1)}%)</div>
-                        <div><b>Total analyzed time:</b> ${(correctTime + incorrectTime).toFixed(1)}s</div>
-                    </div>
-                    ${improvementText}
-                    <div style="margin-top: 15px;">
-                        <h3 style="margin: 5px 0;">Presentation Tips</h3>
-                        <ul style="margin: 5px 0; padding-left: 20px;">
-                            <li>Maintain eye contact with your audience</li>
-                            <li>Use open hand gestures to emphasize points</li>
-                            <li>Distribute weight evenly on both feet</li>
-                            <li>Keep shoulders relaxed and back straight</li>
-                        </ul>
-                    </div>
-                `;
-                
-                // Update progress tracking data
-                progressData.sessionsCompleted += 1;
-                progressData.totalPracticeTime += (correctTime + incorrectTime) / 60; // Convert seconds to minutes
-                
-                // Save updated progress data
-                localStorage.setItem('presentationProgressData', JSON.stringify(progressData));
-                
-                // Update progress display
-                updateProgressDisplay();
-                
-                // Reset counters for next 5 min interval
-                correctFrames = 0; incorrectFrames = 0; totalFrames = 0;
-            }
-
-            main();
-        </script>
-    </body>
-</html>
-"""
+# The page and static files, held in memory with precompressed variants
+assets = StaticAssets("static", pages=["index.html"], reload=STATIC_RELOAD)
+
+# Shared server-side inference for /ws/frames, scheduled fairly between streams; created on first use
+frame_scheduler = None
+
+def get_frame_scheduler():
+    from stream_scheduler import StreamScheduler
+
+    global frame_scheduler
+    if frame_scheduler is None:
+        workers = int(os.environ.get("POSE_WORKERS", os.cpu_count() or 1))
+        max_streams = int(os.environ.get("POSE_MAX_STREAMS", "0")) or None
+        frame_scheduler = StreamScheduler(
+            workers=workers, deadline=FRAME_DEADLINE, options=DETECTOR_OPTIONS, max_streams=max_streams
+        )
+    return frame_scheduler
+
+# Per-session landmark recordings, created on first use
+session_store = None
+
+def get_session_store():
+    from session_store import SessionStore
+
+    global session_store
+    if session_store is None:
+        session_store = SessionStore(os.path.join(DATA_DIR, "sessions"))
+    return session_store
+
+# Practice history and progress aggregates, created on first use
+history_store = None
+
+def get_history_store():
+    from history_store import HistoryStore
+
+    global history_store
+    if history_store is None:
+        os.makedirs(DATA_DIR, exist_ok=True)
+        history_store = HistoryStore(os.path.join(DATA_DIR, "history.db"))
+    return history_store
+
+UserId = Path(..., pattern=r"^[A-Za-z0-9_-]{1,128}$")
+
+# Finite and non-negative: summaries are added permanently to a user's progress totals
+Seconds = confloat(ge=0, allow_inf_nan=False)
+
+class SessionSummary(BaseModel):
+    # Times in seconds; timestamp in epoch milliseconds (defaults to now)
+    timestamp: Optional[confloat(allow_inf_nan=False)] = None
+    correctTime: Seconds
+    incorrectTime: Seconds
+    # Seconds each rule was failing, keyed by the browser's rule names (e.g. "backStraight")
+    ruleFailures: Dict[str, Seconds] = {}
+
+@app.post("/api/users/{user_id}/sessions")
+def add_session(summary: SessionSummary, user_id: str = UserId):
+    from posture_rules import JS_NAMES
+
+    rule_names = {js_name: rule for rule, js_name in JS_NAMES.items()}
+    unknown = set(summary.ruleFailures) - set(rule_names)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown rules: {', '.join(sorted(unknown))}")
+    return get_history_store().add_session(
+        user_id,
+        summary.correctTime,
+        summary.incorrectTime,
+        {rule_names[name]: seconds for name, seconds in summary.ruleFailures.items()},
+        timestamp=None if summary.timestamp is None else summary.timestamp / 1000.0,
+    )
+
+@app.get("/api/users/{user_id}/progress")
+def get_progress(user_id: str = UserId):
+    return get_history_store().progress(user_id)
+
+@app.get("/api/users/{user_id}/sessions")
+def list_sessions(
+    user_id: str = UserId,
+    start: Optional[float] = Query(None, description="Earliest timestamp (epoch ms)"),
+    end: Optional[float] = Query(None, description="Latest timestamp, exclusive (epoch ms)"),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    before = None
+    if cursor is not None:
+        try:
+            before_time, before_id = cursor.split(":")
+            before = (float(before_time), int(before_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    sessions = get_history_store().sessions(
+        user_id,
+        start=None if start is None else start / 1000.0,
+        end=None if end is None else end / 1000.0,
+        before=before,
+        limit=limit,
+    )
+    next_cursor = sessions[-1]["cursor"] if len(sessions) == limit else None
+    for session in sessions:
+        session["timestamp"] *= 1000.0
+        del session["cursor"]
+    return {"sessions": sessions, "nextCursor": next_cursor}
+
+# Open WebSocket connections per endpoint
+active_connections = {"session": 0, "frames": 0}
+
+session_frames = metrics.counter("pose_session_frames_total", "Landmark frames received on /ws/session.")
+session_coalesced = metrics.counter(
+    "pose_session_frames_coalesced_total", "Landmark frames replaced by a newer one before scoring."
+)
+stream_frames = metrics.counter("pose_stream_frames_total", "Image frames processed on /ws/frames.")
+stream_dropped = metrics.counter(
+    "pose_stream_frames_dropped_total", "Image frames dropped on /ws/frames because a newer one arrived."
+)
+metrics.callback("pose_session_connections", lambda: active_connections["session"], "Open /ws/session connections.")
+metrics.callback("pose_stream_connections", lambda: active_connections["frames"], "Open /ws/frames connections.")
+metrics.callback(
+    "pose_inference_queue_depth",
+    lambda: frame_scheduler.queue_depth if frame_scheduler else None,
+    "Frames waiting for server-side inference.",
+)
+metrics.callback(
+    "pose_inference_in_flight",
+    lambda: frame_scheduler.in_flight if frame_scheduler else None,
+    "Batches of frames currently in server-side inference.",
+)
+metrics.callback(
+    "pose_inference_dropped_total",
+    lambda: frame_scheduler.replaced if frame_scheduler else None,
+    "Frames waiting for inference that were replaced by a newer one from the same stream.",
+    kind="counter",
+)
+metrics.callback(
+    "pose_inference_expired_total",
+    lambda: frame_scheduler.expired if frame_scheduler else None,
+    "Frames dropped because they could not start inference within the latency budget.",
+    kind="counter",
+)
+
+@app.get("/api/streams")
+def list_streams():
+    # Achieved and target frame rates and drop counts for each /ws/frames stream
+    if frame_scheduler is None:
+        return {"workers": 0, "capacityFps": None, "queueDepth": 0, "inFlight": 0, "streams": []}
+    return frame_scheduler.stats()
+
+@app.get("/metrics")
+def read_metrics():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.api_route("/", methods=["GET", "HEAD"])
+async def read_root(request: Request):
+    asset, cache_control = assets.page("index.html")
+    return assets.response(asset, cache_control, request.headers, request.method)
+
+@app.api_route("/static/{name:path}", methods=["GET", "HEAD"])
+async def read_static(name: str, request: Request):
+    found = assets.get(name)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return assets.response(*found, request.headers, request.method)
+
+@app.websocket("/ws/session")
+async def session_socket(websocket: WebSocket, session: str = None):
+    # Scores browser landmarks server-side. Frames that arrive while we are still
+    # scoring or sending are coalesced, so only the newest one is ever processed.
+    # Frames are JSON text or binary frames in the wire_format layout. With a
+    # ?session=<id>, every received frame is also appended to the session store.
+    import numpy as np
+    from posture_rules import score_posture
+    from rolling_stats import RollingPostureStats
+    from wire_format import FrameDecoder, WireFormatError
+
+    writer = None
+    if session is not None:
+        try:
+            writer = get_session_store().writer(session)
+        except ValueError as e:
+            await websocket.close(code=1008, reason=str(e))
+            return
+
+    await websocket.accept()
+    active_connections["session"] += 1
+    slot = LatestSlot(drop_counter=session_coalesced)
+    stats = RollingPostureStats()
+    last_stats_sent = 0.0
+    decoder = FrameDecoder()
+
+    def parse_binary_frame(data):
+        try:
+            with metrics.stage("wire_decode"):
+                t, landmarks = decoder.decode(data)
+        except WireFormatError as e:
+            return None, f"Invalid frame: {e}"
+        return (t / 1000.0, landmarks), None
+
+    def parse_frame(text):
+        try:
+            message = json.loads(text)
+            landmarks = np.asarray(message["landmarks"], dtype=np.float32)
+            if landmarks.shape != (33, 4):
+                raise ValueError("expected 33 landmarks of [x, y, z, visibility]")
+        except (KeyError, TypeError, ValueError) as e:
+            return None, f"Invalid frame: {e}"
+        # Client timestamps are epoch milliseconds
+        t = message.get("t")
+        return (t / 1000.0 if isinstance(t, (int, float)) else time.time(), landmarks), None
+
+    async def receive_frames():
+        last_flush = time.monotonic()
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    frame, error = parse_binary_frame(message["bytes"])
+                else:
+                    frame, error = parse_frame(message.get("text"))
+                session_frames.inc()
+                slot.put(frame or error)
+                if writer is not None and frame is not None:
+                    writer.append(*frame)
+                    if time.monotonic() - last_flush > SESSION_FLUSH_INTERVAL:
+                        writer.flush()
+                        last_flush = time.monotonic()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            item = await slot.get()
+            if item is None:
+                break
+            if isinstance(item, str):
+                await websocket.send_json({"error": item})
+                continue
+            t, landmarks = item
+            with metrics.stage("score"):
+                scores = score_posture(landmarks)
+                stats.update(t, bool(scores.is_correct[0]), scores.failed(0))
+            result = scores.result(0)
+            result["t"] = t * 1000.0
+            result["dropped"] = slot.dropped
+            # Rolling posture time, attached about once per second
+            if time.monotonic() - last_stats_sent >= 1.0:
+                last_stats_sent = time.monotonic()
+                result["stats"] = {"last30s": stats.query(30), "last5min": stats.query(300), "session": stats.query()}
+            await websocket.send_json(result)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_connections["session"] -= 1
+        receiver.cancel()
+        if writer is not None:
+            writer.close()
+
+@app.websocket("/ws/frames")
+async def frames_socket(websocket: WebSocket):
+    # Runs pose detection on JPEG/WebP frames from the client and returns landmarks only.
+    # Only the newest frame is processed; older ones are dropped so latency stays bounded,
+    # and inference is shared fairly with other streams by the frame scheduler.
+    import cv2
+    import numpy as np
+    from async_detector import FrameDropped
+    from stream_scheduler import StreamLimitReached
+
+    await websocket.accept()
+    scheduler = get_frame_scheduler()
+    try:
+        # Waits for a free detector when POSE_MAX_STREAMS streams are already open
+        stream = await scheduler.open_stream()
+    except StreamLimitReached as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    active_connections["frames"] += 1
+    slot = LatestSlot(drop_counter=stream_dropped)
+
+    def decode(data):
+        # Runs on a scheduler worker, so decoding never blocks the event loop
+        with metrics.stage("image_decode"):
+            img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("could not decode image")
+        return img
+
+    async def receive_frames():
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("bytes") is not None:
+                    slot.put((time.perf_counter(), message["bytes"]))
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_frames())
+    try:
+        while True:
+            item = await slot.get()
+            if item is None:
+                break
+            received_at, data = item
+            try:
+                landmarks = await scheduler.submit(stream, data, received_at, decode=decode)
+            except FrameDropped:
+                continue
+            except ValueError as e:
+                await websocket.send_json({"error": f"Invalid frame: {e}"})
+                continue
+            latency = time.perf_counter() - received_at
+            metrics.observe("frame_latency", latency)
+            stream_frames.inc()
+            await websocket.send_json({
+                "landmarks": np.round(landmarks.data, 5).tolist() if landmarks.detected else None,
+                "width": landmarks.width,
+                "height": landmarks.height,
+                "dropped": slot.dropped + stream.expired,
+                "targetFps": round(stream.target_fps, 1),
+            })
+    except WebSocketDisconnect:
+        pass
+    finally:
+        active_connections["frames"] -= 1
+        scheduler.close_stream(stream)
+        receiver.cancel()
@@ -0,0 +1,147 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Stage timings are only recorded when profiling is on; counters and gauges always are
+enabled = os.environ.get("POSE_PROFILING", "") not in ("", "0")
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Log-spaced bucket upper bounds in seconds, from 10 µs to ~100 s
+BUCKETS = tuple(1e-5 * 10 ** (i / 8) for i in range(57))
+
+_NULL_TIMER = nullcontext()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+class Histogram:
+    """Fixed-bucket latency histogram with approximate quantiles."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(BUCKETS, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        with self._lock:
+            counts = list(self.counts)
+            count = self.count
+        if not count:
+            return float("nan")
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else lower
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+
+class _Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+_stages = {}
+_counters = {}
+_callbacks = {}
+_registry_lock = threading.Lock()
+
+
+def stage(name):
+    """Context manager timing one pipeline stage; a shared no-op when profiling is off."""
+    if not enabled:
+        return _NULL_TIMER
+    histogram = _stages.get(name)
+    if histogram is None:
+        with _registry_lock:
+            histogram = _stages.setdefault(name, Histogram())
+    return _Timer(histogram)
+
+
+def observe(name, seconds):
+    if enabled:
+        histogram = _stages.get(name)
+        if histogram is None:
+            with _registry_lock:
+                histogram = _stages.setdefault(name, Histogram())
+        histogram.observe(seconds)
+
+
+def counter(name, help_text=""):
+    with _registry_lock:
+        if name not in _counters:
+            _counters[name] = (Counter(), help_text)
+        return _counters[name][0]
+
+
+def callback(name, read, help_text="", kind="gauge"):
+    # read() is called at scrape time and returns the current value (or None to skip it)
+    with _registry_lock:
+        _callbacks[name] = (read, help_text, kind)
+
+
+def render_prometheus():
+    lines = [
+        "# HELP pose_stage_duration_seconds Time spent in each processing stage.",
+        "# TYPE pose_stage_duration_seconds summary",
+    ]
+    with _registry_lock:
+        stages = sorted(_stages.items())
+        counters = sorted(_counters.items())
+        callbacks = sorted(_callbacks.items())
+    for name, histogram in stages:
+        for q in QUANTILES:
+            value = histogram.quantile(q)
+            value = "NaN" if value != value else f"{value:.9g}"
+            lines.append(f'pose_stage_duration_seconds{{stage="{name}",quantile="{q}"}} {value}')
+        lines.append(f'pose_stage_duration_seconds_sum{{stage="{name}"}} {histogram.sum:.9g}')
+        lines.append(f'pose_stage_duration_seconds_count{{stage="{name}"}} {histogram.count}')
+    for name, (value, help_text) in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value.value}")
+    for name, (read, help_text, kind) in callbacks:
+        value = read()
+        if value is None:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
@@ -1,40 +1,484 @@
-import cv2
-import mediapipe as mp
+import itertools
+import queue
+import threading
+from collections import namedtuple
+
 import numpy as np
 
-class PoseDetector:
+import metrics
+
+# cv2 and mediapipe are imported where they are first needed, so importing this module
+# (e.g. from the web app) stays cheap until a detector is actually created.
+
+NUM_LANDMARKS = 33
+
+# A run of consecutive video frames: landmarks is (N, 33, 4), NaN where no pose was found
+LandmarkChunk = namedtuple("LandmarkChunk", ["start", "timestamps", "landmarks"])
+
+# Common joint angles as (first, vertex, last) landmark triplets
+ANGLE_TRIPLETS = {
+    "left_elbow": (11, 13, 15),
+    "right_elbow": (12, 14, 16),
+    "left_shoulder": (13, 11, 23),
+    "right_shoulder": (14, 12, 24),
+    "left_hip": (11, 23, 25),
+    "right_hip": (12, 24, 26),
+    "left_knee": (23, 25, 27),
+    "right_knee": (24, 26, 28),
+}
+
+
+def calculate_angles(landmarks, triplets, use_z=False, image_size=None):
+    """Angles in degrees at the middle landmark of each triplet, as an (N, len(triplets)) array.
+
+    2D angles match PoseDetector.calculate_angle (counter-clockwise, 0-360). With use_z the
+    unsigned 3D angle between the two limbs (0-180) is returned instead. Pass image_size=(w, h)
+    to measure normalized landmarks in pixel space.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[np.newaxis]
+    if use_z and landmarks.shape[-1] < 3:
+        raise ValueError(f"use_z needs (x, y, z) landmarks, got {landmarks.shape[-1]} columns")
+    idx = np.asarray(triplets, dtype=np.intp).reshape(-1, 3)
+    points = landmarks[:, :, :3 if use_z else 2]
+    if image_size is not None:
+        scale = np.ones(points.shape[-1], dtype=np.float32)
+        scale[:2] = image_size
+        points = points * scale
+
+    vertex = points[:, idx[:, 1]]
+    first = points[:, idx[:, 0]] - vertex
+    last = points[:, idx[:, 2]] - vertex
+
+    if not use_z:
+        angles = np.degrees(
+            np.arctan2(last[..., 1], last[..., 0]) - np.arctan2(first[..., 1], first[..., 0])
+        )
+        return np.mod(angles, 360.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos = np.einsum("ntk,ntk->nt", first, last) / (
+            np.linalg.norm(first, axis=-1) * np.linalg.norm(last, axis=-1)
+        )
+    return np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+
+class LandmarkFrame:
+    """Preallocated (33, 4) float32 landmark buffer: x, y, z, visibility."""
+
     def __init__(self):
+        self.data = np.zeros((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._pixels = np.zeros((NUM_LANDMARKS, 2), dtype=np.float32)
+        self.width = 0
+        self.height = 0
+        self.detected = False
+
+    def update(self, landmarks, width, height):
+        # Copy the MediaPipe landmark list into the existing buffer in one pass
+        if landmarks is None:
+            self.detected = False
+            return self
+        values = itertools.chain.from_iterable((lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks)
+        self.data.reshape(-1)[:] = np.fromiter(values, dtype=np.float32, count=NUM_LANDMARKS * 4)
+        self.set_size(width, height)
+        self.detected = True
+        return self
+
+    def set_size(self, width, height):
+        self.width, self.height = width, height
+        np.multiply(self.data[:, :2], (width, height), out=self._pixels)
+
+    @property
+    def normalized(self):
+        # View of the x, y, z columns in MediaPipe's normalized coordinates
+        return self.data[:, :3]
+
+    @property
+    def visibility(self):
+        return self.data[:, 3]
+
+    @property
+    def pixels(self):
+        # View of the x, y columns scaled to the image size of the last update
+        return self._pixels
+
+    def as_list(self):
+        # Legacy [[id, cx, cy], ...] layout
+        if not self.detected:
+            return []
+        return [[i, int(x), int(y)] for i, (x, y) in enumerate(self._pixels)]
+
+    def __len__(self):
+        return NUM_LANDMARKS if self.detected else 0
+
+
+def interpolate_skipped(landmarks, inferred):
+    """Linearly interpolate, in place, rows of an (N, 33, 4) array whose frames were not inferred.
+
+    Skipped rows between two inferred frames are interpolated; skipped rows before the first
+    or after the last inferred frame keep the values they already hold.
+    """
+    keys = np.flatnonzero(inferred)
+    if len(keys) < 2:
+        return landmarks
+    skipped = np.flatnonzero(~inferred)
+    skipped = skipped[(skipped > keys[0]) & (skipped < keys[-1])]
+    if not len(skipped):
+        return landmarks
+    right = np.searchsorted(keys, skipped)
+    left_key, right_key = keys[right - 1], keys[right]
+    weight = ((skipped - left_key) / (right_key - left_key)).astype(np.float32)[:, None, None]
+    landmarks[skipped] = landmarks[left_key] * (1 - weight) + landmarks[right_key] * weight
+    return landmarks
+
+
+class MotionGate:
+    """Skips inference on frames that barely differ from the last inferred frame.
+
+    Frames are compared as small grayscale thumbnails; when the mean absolute difference
+    is below `threshold` (in 0-255 gray levels) inference is skipped, but never for more
+    than `max_skip` frames in a row. Callers that run inference regardless (e.g. because
+    the last frame had no pose) pass force=True, so the frame becomes the new reference and
+    counts towards inference_rate.
+    """
+
+    def __init__(self, threshold=2.0, max_skip=5, size=(64, 48)):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.size = size
+        self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._diff = np.empty_like(self._gray)
+        self._reference = None
+        self._skipped = 0
+        self.frames = 0
+        self.inferences = 0
+
+    def should_infer(self, img, force=False):
+        import cv2
+
+        self.frames += 1
+        cv2.resize(img, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        if not force and self._reference is not None and self._skipped < self.max_skip:
+            cv2.absdiff(self._gray, self._reference, dst=self._diff)
+            if cv2.mean(self._diff)[0] < self.threshold:
+                self._skipped += 1
+                return False
+        # Compare later frames against this one, the last frame we ran inference on
+        self._reference, self._gray = self._gray, (
+            self._reference if self._reference is not None else np.empty_like(self._gray)
+        )
+        self._skipped = 0
+        self.inferences += 1
+        return True
+
+    @property
+    def inference_rate(self):
+        # Share of frames that ran inference
+        return self.inferences / self.frames if self.frames else 1.0
+
+    def reset(self):
+        self._reference = None
+        self._skipped = 0
+
+
+class FramePrefetcher:
+    """Decodes video frames on a background thread into a bounded queue."""
+
+    _END = object()
+
+    def __init__(self, path, maxsize=32, start_frame=0, end_frame=None):
+        self.path = path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._stop = threading.Event()
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="frame-prefetch", daemon=True)
+
+    def _put(self, item):
+        # Block while the consumer is behind, but give up once we've been stopped
+        while not self._stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        import cv2
+
+        cap = cv2.VideoCapture(self.path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"Cannot open video: {self.path}")
+            if self.start_frame:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            index = self.start_frame
+            while self.end_frame is None or index < self.end_frame:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                if not self._put((index, timestamp, frame)):
+                    return
+                index += 1
+        except Exception as e:
+            self._error = e
+        finally:
+            cap.release()
+            self._put(self._END)
+
+    def __iter__(self):
+        self._thread.start()
+        try:
+            while True:
+                item = self.queue.get()
+                if item is self._END:
+                    break
+                yield item
+            if self._error is not None:
+                raise self._error
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class PoseDetector:
+    def __init__(self, model_complexity=1, smooth_landmarks=True,
+                 min_detection_confidence=0.5, min_tracking_confidence=0.5, inference_width=None,
+                 static_image_mode=False):
+        import mediapipe as mp
+        from skeleton_renderer import SkeletonRenderer
+
+        # In video mode (the default) each frame is tracked and smoothed from the previous one;
+        # static_image_mode runs full detection on every frame, independent of the others
+        self.options = {
+            "static_image_mode": static_image_mode,
+            "model_complexity": model_complexity,
+            "smooth_landmarks": smooth_landmarks,
+            "min_detection_confidence": min_detection_confidence,
+            "min_tracking_confidence": min_tracking_confidence,
+        }
         self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose()
-        self.mp_draw = mp.solutions.drawing_utils
+        self.pose = self.mp_pose.Pose(**self.options)
+        self.renderer = SkeletonRenderer()
+        self.landmarks = LandmarkFrame()
+        # Frames wider than this are downscaled before inference. MediaPipe landmarks are
+        # normalized, so they map back onto the original frame unchanged.
+        self.inference_width = inference_width
+        # Conversion buffers reused across frames of the same size
+        self._resized = None
+        self._rgb = None
+        # MediaPipe graphs are not thread-safe; serialize access to self.pose and the buffers
+        self._lock = threading.Lock()
+
+    def close(self):
+        # Release the MediaPipe graph
+        self.pose.close()
+
+    def reset(self):
+        # Forget the tracked region and smoothing state, so the next frame is treated as a new video
+        with self._lock:
+            self.pose.reset()
+        self.landmarks.detected = False
+
+    def _process(self, img):
+        # Downscale and convert into the reusable buffers, then run inference. Caller holds self._lock.
+        import cv2
+
+        with metrics.stage("preprocess"):
+            h, w = img.shape[:2]
+            if self.inference_width and w > self.inference_width:
+                size = (self.inference_width, max(1, round(h * self.inference_width / w)))
+                if self._resized is None or self._resized.shape[1::-1] != size:
+                    self._resized = np.empty((size[1], size[0], 3), dtype=np.uint8)
+                cv2.resize(img, size, dst=self._resized, interpolation=cv2.INTER_AREA)
+                img = self._resized
+            if self._rgb is None or self._rgb.shape != img.shape:
+                self._rgb = np.empty_like(img)
+            cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        with metrics.stage("inference"):
+            return self.pose.process(self._rgb)
+
+    def detect(self, img, out=None):
+        # Reentrant detection: returns a LandmarkFrame instead of storing results on the detector.
+        # Unless static_image_mode is set, results still depend on the frames detected before,
+        # so keep one detector per stream.
+        h, w = img.shape[:2]
+        with self._lock:
+            results = self._process(img)
+        frame = out if out is not None else LandmarkFrame()
+        pose_landmarks = results.pose_landmarks
+        with metrics.stage("landmarks"):
+            return frame.update(pose_landmarks.landmark if pose_landmarks else None, w, h)
+
+    def detect_gated(self, img, gate, out=None):
+        # Like detect, but returns the previous landmarks unchanged when gate sees no motion
+        frame = out if out is not None else self.landmarks
+        if gate.should_infer(img, force=not frame.detected):
+            return self.detect(img, out=frame)
+        return frame
 
     def find_pose(self, img, draw=True):
-        img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        self.results = self.pose.process(img_rgb)
-        if self.results.pose_landmarks and draw:
-            self.mp_draw.draw_landmarks(img, self.results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
+        # With draw=False nothing is rendered or converted, for analysis-only runs
+        with self._lock:
+            self.results = self._process(img)
+        if not self.results.pose_landmarks:
+            # Don't leave the previous frame's landmarks looking current
+            self.landmarks.detected = False
+        elif draw:
+            h, w = img.shape[:2]
+            with metrics.stage("landmarks"):
+                self.landmarks.update(self.results.pose_landmarks.landmark, w, h)
+            with metrics.stage("draw"):
+                self.renderer.draw(img, self.landmarks.data)
         return img
 
     def find_landmarks(self, img, draw=True):
-        self.lm_list = []
-        if self.results.pose_landmarks:
-            for id, lm in enumerate(self.results.pose_landmarks.landmark):
-                h, w, c = img.shape
-                cx, cy = int(lm.x * w), int(lm.y * h)
-                self.lm_list.append([id, cx, cy])
-                if draw:
-                    cv2.circle(img, (cx, cy), 5, (255, 0, 0), cv2.FILLED)
-        return self.lm_list
+        h, w = img.shape[:2]
+        pose_landmarks = self.results.pose_landmarks
+        with metrics.stage("landmarks"):
+            self.landmarks.update(pose_landmarks.landmark if pose_landmarks else None, w, h)
+        if self.landmarks.detected and draw:
+            with metrics.stage("draw"):
+                self.renderer.draw_joints(img, self.landmarks.data, color=(255, 0, 0), radius=5)
+        return self.landmarks
+
+    def draw_feedback(self, img, scores, index=0):
+        # Skeleton plus PoseAnalyzer-style highlights for the rules failing in a PostureScores frame
+        if self.landmarks.detected:
+            with metrics.stage("draw"):
+                self.renderer.draw(img, self.landmarks.data, scores.failed(index))
+        return img
 
     def calculate_angle(self, landmark1, landmark2, landmark3):
+        # NaN when the last find_landmarks call found no pose
+        if not self.landmarks.detected:
+            return float("nan")
+
         # Get the required landmarks
-        x1, y1 = self.lm_list[landmark1][1:]
-        x2, y2 = self.lm_list[landmark2][1:]
-        x3, y3 = self.lm_list[landmark3][1:]
+        x1, y1 = self.landmarks.pixels[landmark1]
+        x2, y2 = self.landmarks.pixels[landmark2]
+        x3, y3 = self.landmarks.pixels[landmark3]
 
         # Calculate the angle
         angle = np.degrees(np.arctan2(y3 - y2, x3 - x2) - np.arctan2(y1 - y2, x1 - x2))
         if angle < 0:
             angle += 360
-        
-        return angle
\ No newline at end of file
+
+        return angle
+
+    def process_video(self, path, chunk_size=256, prefetch=32, start_frame=0, end_frame=None,
+                      motion_gate=None, cache=None, fingerprint=None):
+        # With a LandmarkCache, a previously analyzed frame range is read back instead of re-inferred.
+        # fingerprint is the video's landmark_cache.video_fingerprint, if the caller already has it.
+        if cache is None:
+            yield from self._process_video(path, chunk_size, prefetch, start_frame, end_frame, motion_gate)
+            return
+
+        options = dict(self.options, inference_width=self.inference_width)
+        if motion_gate is not None:
+            options["motion_gate"] = [motion_gate.threshold, motion_gate.max_skip, list(motion_gate.size)]
+        key = cache.key(path, options, start_frame, end_frame, fingerprint)
+        cached = cache.get(key)
+        if cached is not None:
+            timestamps, landmarks = cached
+            for offset in range(0, len(timestamps), chunk_size):
+                yield LandmarkChunk(
+                    start_frame + offset,
+                    timestamps[offset:offset + chunk_size],
+                    landmarks[offset:offset + chunk_size],
+                )
+            return
+
+        chunks = []
+        for chunk in self._process_video(path, chunk_size, prefetch, start_frame, end_frame, motion_gate):
+            chunks.append(chunk)
+            yield chunk
+        # Only reached when the whole range was processed
+        if chunks:
+            timestamps = np.concatenate([c.timestamps for c in chunks])
+            landmarks = np.concatenate([c.landmarks for c in chunks])
+        else:
+            timestamps = np.zeros(0)
+            landmarks = np.zeros((0, NUM_LANDMARKS, 4), dtype=np.float32)
+        cache.put(key, timestamps, landmarks)
+
+    def _process_video(self, path, chunk_size, prefetch, start_frame, end_frame, motion_gate):
+        # Yield LandmarkChunks while the next frames are decoded in the background. With a
+        # MotionGate, still frames skip inference and are interpolated between inferred ones.
+        # The graph is reset first so results don't depend on what this detector saw before.
+        self.reset()
+        if motion_gate is not None:
+            motion_gate.reset()
+        buffer, timestamps = self._new_chunk(chunk_size)
+        inferred = np.zeros(chunk_size, dtype=bool)
+        count = 0
+        chunk_start = start_frame
+        landmarks = self.landmarks
+        for index, timestamp, frame in FramePrefetcher(path, prefetch, start_frame, end_frame):
+            if count == 0:
+                chunk_start = index
+            if motion_gate is None or motion_gate.should_infer(frame, force=not landmarks.detected):
+                self.detect(frame, out=landmarks)
+                inferred[count] = True
+            if landmarks.detected:
+                buffer[count] = landmarks.data
+            timestamps[count] = timestamp
+            count += 1
+            if count == chunk_size:
+                if motion_gate is not None:
+                    interpolate_skipped(buffer, inferred)
+                yield LandmarkChunk(chunk_start, timestamps, buffer)
+                buffer, timestamps = self._new_chunk(chunk_size)
+                inferred[:] = False
+                count = 0
+        if count:
+            if motion_gate is not None:
+                interpolate_skipped(buffer[:count], inferred[:count])
+            yield LandmarkChunk(chunk_start, timestamps[:count], buffer[:count])
+
+    @staticmethod
+    def _new_chunk(chunk_size):
+        landmarks = np.full((chunk_size, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+        return landmarks, np.zeros(chunk_size, dtype=np.float64)
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m pose_detector")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="extract landmarks from every video in a directory")
+    analyze.add_argument("directory")
+    analyze.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    analyze.add_argument("--output", default=None, help="where to write .landmarks.npz files (default: the input directory)")
+    analyze.add_argument("--shard-frames", type=int, default=3000, help="frames per work unit when splitting long videos")
+    analyze.add_argument("--cache", default=None, help="directory for cached landmarks, reused on re-analysis")
+    analyze.add_argument("--inference-width", type=int, default=None, help="downscale wider frames to this width before inference")
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze":
+        from batch_analysis import BatchAnalyzer
+
+        analyzer = BatchAnalyzer(
+            workers=args.workers,
+            shard_frames=args.shard_frames,
+            detector_options={"inference_width": args.inference_width},
+            cache_dir=args.cache,
+        )
+        for path in analyzer.analyze_directory(args.directory, args.output):
+            print(path)
+
+
+if __name__ == "__main__":
+    main()
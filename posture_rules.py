@@ -0,0 +1,161 @@
+import numpy as np
+
+# Landmark indices (same as PoseAnalyzer in static/pose-analyzer.js)
+NOSE = 0
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+KEY_LANDMARKS = [
+    NOSE, LEFT_SHOULDER, RIGHT_SHOULDER,
+    LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST,
+    RIGHT_WRIST, LEFT_HIP, RIGHT_HIP,
+    LEFT_ANKLE, RIGHT_ANKLE,
+]
+
+RULES = (
+    "shoulders_aligned",
+    "hips_aligned",
+    "back_straight",
+    "head_centered",
+    "head_upright",
+    "arms_not_crossed",
+    "arms_in_gesturing_position",
+    "weight_balanced",
+    "shoulders_relaxed",
+)
+
+# Feedback messages and the rules that trigger them, in PoseAnalyzer's order
+FEEDBACK = (
+    ("Relax and level your shoulders", ("shoulders_aligned", "shoulders_relaxed")),
+    ("Balance your weight evenly", ("hips_aligned", "weight_balanced")),
+    ("Stand up straight", ("back_straight",)),
+    ("Center your head and look forward", ("head_centered", "head_upright")),
+    ("Uncross your arms", ("arms_not_crossed",)),
+    ("Position arms for natural gesturing", ("arms_in_gesturing_position",)),
+)
+
+# Rule names as used in the browser's analysis result details
+JS_NAMES = {
+    "shoulders_aligned": "shouldersAligned",
+    "hips_aligned": "hipsAligned",
+    "back_straight": "backStraight",
+    "head_centered": "headCentered",
+    "head_upright": "headUpright",
+    "arms_not_crossed": "armsNotCrossed",
+    "arms_in_gesturing_position": "armsInGesturingPosition",
+    "weight_balanced": "weightBalanced",
+    "shoulders_relaxed": "shouldersRelaxed",
+}
+
+CORRECT_FEEDBACK = "Great presentation posture!"
+NOT_VISIBLE_FEEDBACK = "Move fully into camera view"
+
+
+class PostureScores:
+    """Per-frame rule results for a batch of frames."""
+
+    def __init__(self, visible, details):
+        self.visible = visible
+        self.details = details
+        self.is_correct = visible & np.logical_and.reduce([details[rule] for rule in RULES])
+
+    def __len__(self):
+        return len(self.visible)
+
+    @property
+    def correct_ratio(self):
+        return float(self.is_correct.mean()) if len(self) else 0.0
+
+    @property
+    def incorrect_ratio(self):
+        return 1.0 - self.correct_ratio if len(self) else 0.0
+
+    def failure_rates(self):
+        # Share of visible frames failing each rule
+        visible_count = int(self.visible.sum())
+        if not visible_count:
+            return {rule: 0.0 for rule in RULES}
+        return {rule: float((~self.details[rule] & self.visible).sum()) / visible_count for rule in RULES}
+
+    def summary(self):
+        return {
+            "frames": len(self),
+            "correct_ratio": self.correct_ratio,
+            "incorrect_ratio": self.incorrect_ratio,
+            "failure_rates": self.failure_rates(),
+        }
+
+    def failed(self, index):
+        # Bool per rule in RULES order: True where the rule failed on this frame
+        return np.array([not self.details[rule][index] for rule in RULES])
+
+    def feedback(self, index):
+        if not self.visible[index]:
+            return NOT_VISIBLE_FEEDBACK
+        if self.is_correct[index]:
+            return CORRECT_FEEDBACK
+        items = [
+            message for message, rules in FEEDBACK
+            if not all(self.details[rule][index] for rule in rules)
+        ]
+        return " & ".join(items)
+
+    def result(self, index):
+        # Same shape as PoseAnalyzer.analyzePresentationPosture's return value
+        return {
+            "isCorrect": bool(self.is_correct[index]),
+            "feedback": self.feedback(index),
+            "details": {JS_NAMES[rule]: bool(self.details[rule][index]) for rule in RULES},
+        }
+
+
+def score_posture(landmarks):
+    """Apply PoseAnalyzer.analyzePresentationPosture to an (N, 33, >=2) normalized landmark array."""
+    landmarks = np.asarray(landmarks)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[np.newaxis]
+    x = landmarks[:, :, 0]
+    y = landmarks[:, :, 1]
+
+    # Frames with missing (NaN) key landmarks are reported as not visible
+    visible = ~np.isnan(landmarks[:, KEY_LANDMARKS, :2]).any(axis=(1, 2))
+
+    shoulder_mid_x = (x[:, LEFT_SHOULDER] + x[:, RIGHT_SHOULDER]) / 2
+    hip_mid_x = (x[:, LEFT_HIP] + x[:, RIGHT_HIP]) / 2
+    shoulder_min_x = np.minimum(x[:, LEFT_SHOULDER], x[:, RIGHT_SHOULDER])
+    shoulder_max_x = np.maximum(x[:, LEFT_SHOULDER], x[:, RIGHT_SHOULDER])
+
+    with np.errstate(invalid="ignore"):
+        details = {
+            # 1. Posture checks
+            "shoulders_aligned": np.abs(y[:, LEFT_SHOULDER] - y[:, RIGHT_SHOULDER]) < 0.08,
+            "hips_aligned": np.abs(y[:, LEFT_HIP] - y[:, RIGHT_HIP]) < 0.08,
+            "back_straight": np.abs(shoulder_mid_x - hip_mid_x) < 0.08,
+            # 2. Head position
+            "head_centered": (x[:, NOSE] > shoulder_min_x) & (x[:, NOSE] < shoulder_max_x),
+            "head_upright": y[:, NOSE] < np.minimum(y[:, LEFT_SHOULDER], y[:, RIGHT_SHOULDER]),
+            # 3. Arm position
+            "arms_not_crossed": np.abs(x[:, LEFT_WRIST] - x[:, RIGHT_WRIST]) > 0.15,
+            "arms_in_gesturing_position": (
+                (y[:, LEFT_WRIST] > y[:, LEFT_ELBOW]) & (y[:, RIGHT_WRIST] > y[:, RIGHT_ELBOW])
+                & (y[:, LEFT_WRIST] < y[:, LEFT_HIP]) & (y[:, RIGHT_WRIST] < y[:, RIGHT_HIP])
+            ),
+            # 4. Weight distribution
+            "weight_balanced": (
+                (np.abs(y[:, LEFT_ANKLE] - y[:, RIGHT_ANKLE]) < 0.05)
+                & (np.abs(y[:, LEFT_KNEE] - y[:, RIGHT_KNEE]) < 0.05)
+            ),
+            # 5. Shoulder relaxation
+            "shoulders_relaxed": (y[:, LEFT_SHOULDER] < y[:, LEFT_ELBOW]) & (y[:, RIGHT_SHOULDER] < y[:, RIGHT_ELBOW]),
+        }
+    return PostureScores(visible, details)
@@ -0,0 +1,91 @@
+import math
+
+import numpy as np
+
+from posture_rules import JS_NAMES, RULES
+
+
+class RollingPostureStats:
+    """Time spent in each posture state over sliding windows, from real frame timestamps.
+
+    Each frame accounts for the time since the previous frame (capped at max_gap, so pauses
+    are not counted). Running totals are snapshotted into a ring buffer once per
+    `resolution` seconds, so the totals for any window up to max_window are the current
+    totals minus one snapshot: O(1) per update and per query, with memory fixed by
+    max_window / resolution. Window starts are rounded up to the next `resolution` step,
+    except that windows shorter than `resolution` cover the current step so far.
+    """
+
+    # Columns of the totals vector: correct time, incorrect time, then one per rule
+    CORRECT = 0
+    INCORRECT = 1
+
+    def __init__(self, max_window=300.0, resolution=1.0, max_gap=1.0, rules=RULES):
+        self.max_window = max_window
+        self.resolution = resolution
+        self.max_gap = max_gap
+        self.rules = tuple(rules)
+        self._size = int(math.ceil(max_window / resolution)) + 2
+        self._snapshots = np.zeros((self._size, 2 + len(self.rules)))
+        self._totals = np.zeros(2 + len(self.rules))
+        self._frame = np.zeros_like(self._totals)
+        self._start = None
+        self._last_t = None
+        self._bucket = -1
+
+    def update(self, t, is_correct, failed_rules=()):
+        """Add a frame at time t (seconds). failed_rules is a bool per rule, or the names of failed rules."""
+        if self._start is None:
+            self._start = self._last_t = t
+        dt = min(max(t - self._last_t, 0.0), self.max_gap)
+        self._last_t = max(t, self._last_t)
+
+        # Snapshot the totals as of the start of every bucket we have moved into
+        bucket = int((self._last_t - self._start) // self.resolution)
+        if bucket > self._bucket:
+            for b in range(max(self._bucket + 1, bucket - self._size + 1), bucket + 1):
+                self._snapshots[b % self._size] = self._totals
+            self._bucket = bucket
+
+        frame = self._frame
+        frame[:] = 0.0
+        frame[self.CORRECT if is_correct else self.INCORRECT] = dt
+        failed = self._failed_mask(failed_rules)
+        frame[2:][failed] = dt
+        self._totals += frame
+
+    def _failed_mask(self, failed_rules):
+        if isinstance(failed_rules, np.ndarray) and failed_rules.dtype == bool:
+            return failed_rules
+        failed_rules = list(failed_rules)
+        if failed_rules and isinstance(failed_rules[0], (bool, np.bool_)):
+            return np.asarray(failed_rules, dtype=bool)
+        return np.isin(self.rules, failed_rules)
+
+    def _window_totals(self, window):
+        if window is not None and window > self.max_window:
+            raise ValueError(f"window {window}s exceeds max_window {self.max_window}s")
+        if window is None or self._start is None:
+            return self._totals
+        # First bucket starting inside the window, so the window is never overcounted. A window
+        # shorter than resolution falls inside the current bucket, whose start is used instead:
+        # the next slot has not been written yet and still holds a snapshot from long ago.
+        bucket = int(math.ceil((self._last_t - window - self._start) / self.resolution))
+        bucket = min(bucket, self._bucket)
+        if bucket <= 0:
+            return self._totals
+        return self._totals - self._snapshots[bucket % self._size]
+
+    def query(self, window=None):
+        """Totals over the last `window` seconds, or the whole session when window is None."""
+        totals = self._window_totals(window)
+        correct, incorrect = float(totals[self.CORRECT]), float(totals[self.INCORRECT])
+        total = correct + incorrect
+        return {
+            "correctTime": correct,
+            "incorrectTime": incorrect,
+            "correctPercentage": correct / total * 100 if total else 0.0,
+            "ruleFailures": {
+                JS_NAMES.get(rule, rule): float(seconds) for rule, seconds in zip(self.rules, totals[2:])
+            },
+        }
@@ -0,0 +1,186 @@
+import os
+import re
+import struct
+import threading
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from pose_detector import NUM_LANDMARKS
+
+# File layout: a fixed 64-byte header followed by fixed-size records of
+# (float64 timestamp, (33, 4) landmarks) in the dtype named in the header.
+MAGIC = b"POSESESS"
+VERSION = 1
+HEADER = struct.Struct("<8sHH4sI")
+HEADER_SIZE = 64
+DTYPES = {"f2": np.float16, "f4": np.float32}
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,128}$")
+
+# Session files with an open writer in this process; other processes are kept out by flock
+_open_writers = set()
+_open_writers_lock = threading.Lock()
+
+
+class SessionInUse(ValueError):
+    """Raised when a session file already has a writer."""
+
+
+def record_dtype(landmark_dtype):
+    landmark_dtype = np.dtype(landmark_dtype).newbyteorder("<")
+    return np.dtype([("t", "<f8"), ("landmarks", landmark_dtype, (NUM_LANDMARKS, 4))])
+
+
+class SessionWriter:
+    """Appends (timestamp, landmarks) records to a session file.
+
+    A session has at most one writer at a time: two appending handles would interleave
+    partial records. A second writer fails with SessionInUse until the first is closed.
+    """
+
+    def __init__(self, path, dtype=np.float32):
+        self.path = path
+        self._key = os.path.realpath(path)
+        with _open_writers_lock:
+            if self._key in _open_writers:
+                raise SessionInUse(f"Session is already being recorded: {path}")
+            _open_writers.add(self._key)
+        self._file = None
+        try:
+            self._open(dtype)
+        except BaseException:
+            self.close()
+            raise
+        self._record = np.zeros(1, dtype=self.dtype)
+
+    def _open(self, dtype):
+        self._file = open(self.path, "ab")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise SessionInUse(f"Session is already being recorded: {self.path}") from None
+        size = os.path.getsize(self.path)
+        if size >= HEADER_SIZE:
+            dtype = read_header(self.path)
+        else:
+            code = np.dtype(dtype).str[1:]
+            if code not in DTYPES:
+                raise ValueError(f"Unsupported landmark dtype: {dtype}")
+            header = HEADER.pack(MAGIC, VERSION, NUM_LANDMARKS, code.encode().ljust(4), 4)
+            self._file.truncate(0)
+            self._file.write(header.ljust(HEADER_SIZE, b"\0"))
+            self._file.flush()
+            size = HEADER_SIZE
+        self.dtype = record_dtype(dtype)
+        # Drop a partial trailing record left by an interrupted write
+        excess = (size - HEADER_SIZE) % self.dtype.itemsize
+        if excess:
+            self._file.truncate(size - excess)
+
+    def append(self, timestamp, landmarks):
+        self._record["t"] = timestamp
+        self._record["landmarks"] = np.asarray(landmarks)[:, :4]
+        self._file.write(self._record.tobytes())
+
+    def extend(self, timestamps, landmarks):
+        records = np.empty(len(timestamps), dtype=self.dtype)
+        records["t"] = timestamps
+        records["landmarks"] = np.asarray(landmarks)[..., :4]
+        self._file.write(records.tobytes())
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        # Closing the file also releases the flock
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        with _open_writers_lock:
+            _open_writers.discard(self._key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        magic, version, num_landmarks, code, _ = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC or version != VERSION or num_landmarks != NUM_LANDMARKS:
+        raise ValueError(f"Not a session file: {path}")
+    code = code.rstrip(b"\0 ").decode(errors="replace")
+    if code not in DTYPES:
+        raise ValueError(f"Unsupported landmark dtype {code!r} in {path}")
+    return DTYPES[code]
+
+
+class SessionReader:
+    """Memory-mapped view of a session file; slices share memory with the page cache."""
+
+    def __init__(self, path):
+        self.path = path
+        self.dtype = record_dtype(read_header(path))
+        self.refresh()
+
+    def refresh(self):
+        # Pick up records appended since the file was opened (ignoring a partial last record)
+        count = (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_SIZE, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def timestamps(self):
+        return self.records["t"]
+
+    @property
+    def landmarks(self):
+        return self.records["landmarks"]
+
+    def time_range(self, start=None, end=None):
+        # Records with start <= t < end, as views into the mapped file
+        timestamps = self.timestamps
+        lo = 0 if start is None else np.searchsorted(timestamps, start, side="left")
+        hi = len(timestamps) if end is None else np.searchsorted(timestamps, end, side="left")
+        records = self.records[lo:hi]
+        return records["t"], records["landmarks"]
+
+
+class SessionStore:
+    """Directory of per-session landmark files."""
+
+    SUFFIX = ".session"
+
+    def __init__(self, directory, dtype=np.float16):
+        self.directory = directory
+        self.dtype = dtype
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, session_id):
+        if not _SESSION_ID.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, session_id + self.SUFFIX)
+
+    def writer(self, session_id):
+        return SessionWriter(self.path(session_id), self.dtype)
+
+    def reader(self, session_id):
+        return SessionReader(self.path(session_id))
+
+    def sessions(self):
+        return sorted(
+            name[:-len(self.SUFFIX)] for name in os.listdir(self.directory) if name.endswith(self.SUFFIX)
+        )
@@ -0,0 +1,140 @@
+import numpy as np
+
+from pose_detector import NUM_LANDMARKS
+from posture_rules import (
+    LEFT_ANKLE, LEFT_ELBOW, LEFT_HIP, LEFT_SHOULDER, LEFT_WRIST, NOSE, RIGHT_ANKLE, RIGHT_ELBOW,
+    RIGHT_HIP, RIGHT_SHOULDER, RIGHT_WRIST, RULES,
+)
+
+# MediaPipe Pose's skeleton (mp.solutions.pose.POSE_CONNECTIONS), as (start, end) landmark indices
+POSE_CONNECTIONS = np.array([
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+], dtype=np.intp)
+
+# Colors are BGR
+WHITE = (224, 224, 224)
+RED = (0, 0, 255)
+YELLOW = (0, 255, 255)
+ORANGE = (0, 165, 255)
+CYAN = (255, 255, 0)
+MAGENTA = (255, 0, 255)
+
+# Rule-violation highlights, as in PoseAnalyzer.drawFeedbackVisualization:
+# (rules, landmarks to ring when any of them fails, ring color)
+HIGHLIGHTS = (
+    (("shoulders_aligned", "shoulders_relaxed"), (LEFT_SHOULDER, RIGHT_SHOULDER), YELLOW),
+    (
+        ("arms_not_crossed", "arms_in_gesturing_position"),
+        (LEFT_ELBOW, RIGHT_ELBOW, LEFT_WRIST, RIGHT_WRIST),
+        ORANGE,
+    ),
+    (("head_centered", "head_upright"), (NOSE,), CYAN),
+    (("weight_balanced", "hips_aligned"), (LEFT_ANKLE, RIGHT_ANKLE), MAGENTA),
+)
+
+
+class SkeletonRenderer:
+    """Draws pose skeletons and posture feedback onto BGR frames with a few bulk OpenCV calls.
+
+    All connections are one cv2.polylines call, and all joints another: a zero-length
+    segment drawn with a thick pen is a filled disc. Landmarks are (33, >=4) normalized
+    arrays such as LandmarkFrame.data; points below `min_visibility` or NaN are skipped.
+    Defaults match MediaPipe's draw_landmarks style; antialias=True smooths edges at
+    roughly three times the drawing cost.
+    """
+
+    def __init__(self, connection_color=WHITE, thickness=2, joint_color=RED, joint_radius=2,
+                 joint_border=WHITE, min_visibility=0.5, highlight_radius=15, antialias=False,
+                 connections=POSE_CONNECTIONS):
+        self.connection_color = connection_color
+        self.thickness = thickness
+        self.joint_color = joint_color
+        self.joint_radius = joint_radius
+        self.joint_border = joint_border
+        self.min_visibility = min_visibility
+        self.antialias = antialias
+        self.connections = np.asarray(connections, dtype=np.intp)
+        angles = np.linspace(0, 2 * np.pi, 36, endpoint=False)
+        # Ring outline around a highlighted joint, as offsets from its center
+        ring = np.stack([np.cos(angles), np.sin(angles)], axis=1) * highlight_radius
+        self._ring = np.round(ring).astype(np.int32)
+        self._rule_index = {rule: i for i, rule in enumerate(RULES)}
+
+    def _line_type(self):
+        import cv2
+
+        return cv2.LINE_AA if self.antialias else cv2.LINE_8
+
+    def _points(self, img, landmarks):
+        # Pixel coordinates and a visible mask per landmark
+        landmarks = np.asarray(landmarks)
+        h, w = img.shape[:2]
+        points = landmarks[:NUM_LANDMARKS, :2] * (w, h)
+        visible = np.isfinite(points).all(axis=1)
+        if landmarks.shape[1] > 3:
+            visible &= landmarks[:NUM_LANDMARKS, 3] >= self.min_visibility
+        return np.rint(np.where(visible[:, None], points, 0)).astype(np.int32), visible
+
+    def draw(self, img, landmarks, failed=None):
+        # Skeleton, then feedback highlights when `failed` (a bool per rule in RULES order) has any
+        points, visible = self._points(img, landmarks)
+        self._draw_connections(img, points, visible, self.connection_color, self.thickness)
+        self._draw_joints(img, points, visible)
+        if failed is not None:
+            self._draw_feedback(img, points, visible, np.asarray(failed, dtype=bool))
+        return img
+
+    def draw_joints(self, img, landmarks, color=None, radius=None):
+        points, visible = self._points(img, landmarks)
+        self._draw_joints(img, points, visible, color, radius)
+        return img
+
+    def draw_feedback(self, img, landmarks, failed):
+        points, visible = self._points(img, landmarks)
+        self._draw_feedback(img, points, visible, np.asarray(failed, dtype=bool))
+        return img
+
+    def _draw_connections(self, img, points, visible, color, thickness):
+        import cv2
+
+        shown = self.connections[visible[self.connections].all(axis=1)]
+        if len(shown):
+            cv2.polylines(img, points[shown], False, color, thickness, self._line_type())
+
+    def _draw_joints(self, img, points, visible, color=None, radius=None):
+        import cv2
+
+        radius = self.joint_radius if radius is None else radius
+        shown = points[visible]
+        if not len(shown):
+            return
+        # Each joint as a degenerate segment: the pen's round cap fills a disc
+        dots = np.repeat(shown[:, None, :], 2, axis=1)
+        line_type = self._line_type()
+        if color is None and self.joint_border is not None:
+            cv2.polylines(img, dots, False, self.joint_border, 2 * (radius + 1), line_type)
+        cv2.polylines(img, dots, False, self.joint_color if color is None else color, 2 * radius, line_type)
+
+    def _draw_feedback(self, img, points, visible, failed):
+        import cv2
+
+        if not failed.any():
+            return
+        line_type = self._line_type()
+        for rules, joints, color in HIGHLIGHTS:
+            if not any(failed[self._rule_index[rule]] for rule in rules):
+                continue
+            joints = [j for j in joints if visible[j]]
+            if joints:
+                rings = points[joints][:, None, :] + self._ring
+                cv2.polylines(img, rings, True, color, 3, line_type)
+        torso = [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP]
+        if failed[self._rule_index["back_straight"]] and visible[torso].all():
+            # Shoulder midpoint to hip midpoint, to show the lean
+            shoulders = (points[LEFT_SHOULDER] + points[RIGHT_SHOULDER]) // 2
+            hips = (points[LEFT_HIP] + points[RIGHT_HIP]) // 2
+            cv2.line(img, tuple(int(v) for v in shoulders), tuple(int(v) for v in hips), YELLOW, 3, line_type)
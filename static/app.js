@@ -18,28 +18,58 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initialize pose analyzer
     const poseAnalyzer = new PoseAnalyzer();
     
+    // Skip inference on still frames (disable with ?adaptive=0)
+    const motionGate = new URLSearchParams(window.location.search).get('adaptive') === '0'
+        ? null
+        : new MotionGate({ threshold: 2, maxSkip: 5 });
+    let lastPoseLandmarks = null;
+    
     // Tracking variables
-    let correctFrames = 0, incorrectFrames = 0, totalFrames = 0;
-    let correctTime = 0, incorrectTime = 0;
+    // Posture time from real frame timestamps, over sliding windows of up to 5 minutes
+    const STATS_WINDOW = 300; // seconds
+    const postureStats = new RollingPostureStats({ maxWindow: STATS_WINDOW });
     let lastChartTime = Date.now();
     let pieChart = null;
     
-    // Load progress data from localStorage
+    // Progress data from the history API
     let progressData = {
         sessionsCompleted: 0,
         totalPracticeTime: 0 // in minutes
     };
     
-    // Session history for tracking improvement
-    let sessionHistory = [];
+    // Anonymous id that keys this browser's history on the server
+    let userId = localStorage.getItem('presentationUserId');
+    if (!userId) {
+        userId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+        localStorage.setItem('presentationUserId', userId);
+    }
+    const historyApi = `/api/users/${encodeURIComponent(userId)}`;
+    
+    // Optional server-side scoring over /ws/session (enable with ?serverScoring=1)
+    const serverScoringEnabled = new URLSearchParams(window.location.search).get('serverScoring') === '1';
+    const MAX_SOCKET_BUFFER = 64 * 1024; // skip sending while this much is still unsent
+    let scoringSocket = null;
+    let serverResult = null;
+    const landmarkEncoder = new LandmarkEncoder({ delta: true, keyframeInterval: 30 });
+    // Identifies this practice session's recording on the server
+    const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    
+    // Optional server-side inference over /ws/frames for low-end devices (enable with ?serverInference=1)
+    const serverInferenceEnabled = new URLSearchParams(window.location.search).get('serverInference') === '1';
+    const FRAME_QUALITY = 0.7;
+    let targetFps = 15;
     
     // Initialize the application
     function init() {
         // Try to load existing progress data
         loadProgressData();
         
-        // Initialize MediaPipe Pose
-        initializePose();
+        // Initialize pose detection in the browser or on the server
+        if (serverInferenceEnabled) {
+            initializeServerInference();
+        } else {
+            initializePose();
+        }
         
         // Initialize camera
         initializeCamera();
@@ -47,25 +77,23 @@ document.addEventListener('DOMContentLoaded', () => {
         // Initialize chart
         initializeChart();
         
+        // Connect to server-side scoring if requested
+        if (serverScoringEnabled) {
+            connectScoringSocket();
+        }
+        
         // Show UI elements
         chartContainer.style.display = 'block';
         statsDiv.style.display = 'block';
     }
     
-    // Load progress data from localStorage
-    function loadProgressData() {
+    // Load progress data from the history API
+    async function loadProgressData() {
         try {
-            // Load progress data
-            const savedProgressData = localStorage.getItem('presentationProgressData');
-            if (savedProgressData) {
-                progressData = JSON.parse(savedProgressData);
-            }
-            
-            // Load session history
-            const savedSessionHistory = localStorage.getItem('presentationSessionHistory');
-            if (savedSessionHistory) {
-                sessionHistory = JSON.parse(savedSessionHistory);
-            }
+            await migrateLocalHistory();
+            const response = await fetch(`${historyApi}/progress`);
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            progressData = await response.json();
             
             // Update UI with loaded data
             updateProgressDisplay();
@@ -74,12 +102,69 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
     
+    // Upload session history saved in localStorage by earlier versions, then remove it
+    async function migrateLocalHistory() {
+        const savedSessionHistory = localStorage.getItem('presentationSessionHistory');
+        if (!savedSessionHistory) return;
+        
+        for (const session of JSON.parse(savedSessionHistory)) {
+            await postSession({
+                timestamp: session.timestamp,
+                correctTime: session.correctTime,
+                incorrectTime: session.incorrectTime
+            });
+        }
+        localStorage.removeItem('presentationSessionHistory');
+        localStorage.removeItem('presentationProgressData');
+    }
+    
+    // Record a session summary and return the updated progress
+    async function postSession(sessionData) {
+        const response = await fetch(`${historyApi}/sessions`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(sessionData)
+        });
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        return response.json();
+    }
+    
     // Update progress display
     function updateProgressDisplay() {
         sessionsCountElement.textContent = progressData.sessionsCompleted;
         totalPracticeTimeElement.textContent = progressData.totalPracticeTime.toFixed(1);
     }
     
+    // Connect to the server-side scoring WebSocket, reconnecting if it drops
+    function connectScoringSocket() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        scoringSocket = new WebSocket(`${protocol}//${window.location.host}/ws/session?session=${encodeURIComponent(sessionId)}`);
+        scoringSocket.binaryType = 'arraybuffer';
+        
+        // Delta frames need the server to have seen our previous frame
+        scoringSocket.onopen = () => landmarkEncoder.reset();
+        
+        scoringSocket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (!message.error) {
+                serverResult = message;
+            }
+        };
+        
+        scoringSocket.onclose = () => {
+            serverResult = null;
+            setTimeout(connectScoringSocket, 2000);
+        };
+    }
+    
+    // Send landmarks for server-side scoring, unless the socket is backed up
+    function sendLandmarks(landmarks) {
+        if (!scoringSocket || scoringSocket.readyState !== WebSocket.OPEN) return;
+        if (scoringSocket.bufferedAmount > MAX_SOCKET_BUFFER) return;
+        
+        scoringSocket.send(landmarkEncoder.encode(landmarks, performance.timeOrigin + performance.now()));
+    }
+    
     // Initialize MediaPipe Pose
     function initializePose() {
         const pose = new window.Pose({
@@ -98,7 +183,12 @@ document.addEventListener('DOMContentLoaded', () => {
         // Start detection loop
         const processVideo = async () => {
             if (videoElement.readyState >= 2) {
-                await pose.send({ image: videoElement });
+                if (motionGate && lastPoseLandmarks && !motionGate.shouldInfer(videoElement)) {
+                    // Little motion since the last analyzed frame: reuse its landmarks
+                    onResults({ image: videoElement, poseLandmarks: lastPoseLandmarks });
+                } else {
+                    await pose.send({ image: videoElement });
+                }
             }
             requestAnimationFrame(processVideo);
         };
@@ -106,6 +196,55 @@ document.addEventListener('DOMContentLoaded', () => {
         processVideo();
     }
     
+    // Stream compressed camera frames to the server and draw the landmarks it returns
+    function initializeServerInference() {
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const frameCanvas = document.createElement('canvas');
+        const frameCtx = frameCanvas.getContext('2d');
+        const frameType = frameCanvas.toDataURL('image/webp').startsWith('data:image/webp') ? 'image/webp' : 'image/jpeg';
+        let frameSocket = null;
+        let lastSent = 0;
+        
+        const connect = () => {
+            frameSocket = new WebSocket(`${protocol}//${window.location.host}/ws/frames`);
+            frameSocket.binaryType = 'arraybuffer';
+            
+            frameSocket.onmessage = (event) => {
+                const message = JSON.parse(event.data);
+                if (message.error) return;
+                
+                // Follow the server's suggested rate so it never has to drop our frames
+                targetFps = message.targetFps || targetFps;
+                const poseLandmarks = message.landmarks
+                    ? message.landmarks.map(([x, y, z, visibility]) => ({ x, y, z, visibility }))
+                    : null;
+                onResults({ image: videoElement, poseLandmarks: poseLandmarks });
+            };
+            
+            frameSocket.onclose = () => setTimeout(connect, 2000);
+        };
+        
+        const sendFrame = (now) => {
+            const ready = frameSocket && frameSocket.readyState === WebSocket.OPEN &&
+                          frameSocket.bufferedAmount === 0 && videoElement.readyState >= 2;
+            if (ready && now - lastSent >= 1000 / targetFps) {
+                lastSent = now;
+                frameCanvas.width = videoElement.videoWidth;
+                frameCanvas.height = videoElement.videoHeight;
+                frameCtx.drawImage(videoElement, 0, 0);
+                frameCanvas.toBlob(blob => {
+                    if (blob && frameSocket.readyState === WebSocket.OPEN) {
+                        blob.arrayBuffer().then(buffer => frameSocket.send(buffer));
+                    }
+                }, frameType, FRAME_QUALITY);
+            }
+            requestAnimationFrame(sendFrame);
+        };
+        
+        connect();
+        requestAnimationFrame(sendFrame);
+    }
+    
     // Initialize camera
     function initializeCamera() {
         navigator.mediaDevices.getUserMedia({ video: { width: 640, height: 480 } })
@@ -153,6 +292,8 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Process pose detection results
     function onResults(results) {
+        lastPoseLandmarks = results.poseLandmarks || null;
+        
         // Clear canvas and draw video frame
         canvasCtx.clearRect(0, 0, canvasElement.width, canvasElement.height);
         canvasCtx.drawImage(results.image, 0, 0, canvasElement.width, canvasElement.height);
@@ -164,21 +305,27 @@ document.addEventListener('DOMContentLoaded', () => {
             window.drawLandmarks(canvasCtx, results.poseLandmarks, 
                                {color: '#FF0000', lineWidth: 2});
             
-            // Analyze body language
-            const analysisResult = poseAnalyzer.analyzePresentationPosture(results.poseLandmarks);
+            // Analyze body language (using the latest server result when server scoring is on)
+            let analysisResult;
+            if (serverScoringEnabled) {
+                sendLandmarks(results.poseLandmarks);
+            }
+            if (serverResult) {
+                analysisResult = serverResult;
+            } else {
+                analysisResult = poseAnalyzer.analyzePresentationPosture(results.poseLandmarks);
+            }
             
-            // Update counters
+            // Update statistics
+            postureStats.update(performance.now() / 1000, analysisResult.isCorrect, analysisResult.details);
             if (analysisResult.isCorrect) {
                 feedbackDiv.style.color = 'green';
-                correctFrames++;
             } else {
                 feedbackDiv.style.color = 'red';
-                incorrectFrames++;
             }
             
             // Display feedback
             feedbackDiv.textContent = analysisResult.feedback;
-            totalFrames++;
             
             // Draw feedback visualizations
             poseAnalyzer.drawFeedbackVisualization(
@@ -194,7 +341,7 @@ document.addEventListener('DOMContentLoaded', () => {
             
             // Every 5 minutes (300000 ms), show detailed stats
             const now = Date.now();
-            if (now - lastChartTime > 300000 && totalFrames > 0) {
+            if (now - lastChartTime > STATS_WINDOW * 1000 && postureStats.query(STATS_WINDOW).totalTime > 0) {
                 saveSessionData();
                 lastChartTime = now;
             }
@@ -205,54 +352,55 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Update chart with current data
     function updateChart() {
-        if (totalFrames > 0 && pieChart) {
-            const correctPercentage = (correctFrames / totalFrames) * 100;
-            const incorrectPercentage = (incorrectFrames / totalFrames) * 100;
+        const { correctTime, incorrectTime, totalTime, correctPercentage } = postureStats.query(STATS_WINDOW);
+        if (totalTime > 0 && pieChart) {
+            const incorrectPercentage = 100 - correctPercentage;
             
             pieChart.data.datasets[0].data[0] = correctPercentage;
             pieChart.data.datasets[0].data[1] = incorrectPercentage;
             pieChart.update();
             
-            // Update session stats
-            correctTime = correctFrames * (1/30); // assuming ~30 FPS
-            incorrectTime = incorrectFrames * (1/30);
+            // Update session stats (last 5 minutes, plus the last 30 seconds and whole session)
+            const recent = postureStats.query(30);
+            const session = postureStats.query();
             
             sessionStatsDiv.innerHTML = `
                 <div>
                     <p><b>Correct posture:</b> ${correctTime.toFixed(1)}s (${correctPercentage.toFixed(1)}%)</p>
                     <p><b>Incorrect posture:</b> ${incorrectTime.toFixed(1)}s (${incorrectPercentage.toFixed(1)}%)</p>
-                    <p><b>Total analyzed time:</b> ${(correctTime + incorrectTime).toFixed(1)}s</p>
+                    <p><b>Total analyzed time:</b> ${totalTime.toFixed(1)}s</p>
+                    <p><b>Last 30 seconds:</b> ${recent.correctPercentage.toFixed(1)}% correct</p>
+                    <p><b>Whole session:</b> ${session.correctPercentage.toFixed(1)}% correct over ${(session.totalTime / 60).toFixed(1)} min</p>
+                    ${motionGate ? `<p><b>Inference rate:</b> ${(motionGate.inferenceRate * 100).toFixed(0)}% of frames</p>` : ''}
                 </div>
             `;
         }
     }
     
-    // Save session data after 5 minutes
-    function saveSessionData() {
-        // Calculate time in seconds
-        correctTime = correctFrames * (1/30);
-        incorrectTime = incorrectFrames * (1/30);
+    // Save session data every 5 minutes
+    async function saveSessionData() {
+        // Time in seconds over the last 5 minute interval
+        const interval = postureStats.query(STATS_WINDOW);
         
         // Store session data for tracking improvement
         const sessionData = {
             timestamp: Date.now(),
-            correctPercentage: (correctFrames / totalFrames) * 100,
-            correctTime: correctTime,
-            incorrectTime: incorrectTime,
-            totalTime: correctTime + incorrectTime
+            correctTime: interval.correctTime,
+            incorrectTime: interval.incorrectTime,
+            ruleFailures: interval.ruleFailures
         };
-        sessionHistory.push(sessionData);
         
-        // Save session history to localStorage
-        localStorage.setItem('presentationSessionHistory', JSON.stringify(sessionHistory));
+        try {
+            progressData = await postSession(sessionData);
+        } catch (e) {
+            console.error('Error saving session data:', e);
+            return;
+        }
         
         // Calculate improvement metrics
         let improvementText = '';
-        if (sessionHistory.length > 1) {
-            const currentSession = sessionHistory[sessionHistory.length - 1];
-            const previousSession = sessionHistory[sessionHistory.length - 2];
-            
-            const percentageChange = currentSession.correctPercentage - previousSession.correctPercentage;
+        if (progressData.improvement !== null) {
+            const percentageChange = progressData.improvement;
             const improvementDirection = percentageChange >= 0 ? 'improved' : 'decreased';
             const cssClass = percentageChange >= 0 ? 'improvement-positive' : 'improvement-negative';
             
@@ -267,18 +415,8 @@ document.addEventListener('DOMContentLoaded', () => {
         // Update session stats with improvement info
         sessionStatsDiv.innerHTML += improvementText;
         
-        // Update progress tracking data
-        progressData.sessionsCompleted += 1;
-        progressData.totalPracticeTime += (correctTime + incorrectTime) / 60; // Convert seconds to minutes
-        
-        // Save updated progress data
-        localStorage.setItem('presentationProgressData', JSON.stringify(progressData));
-        
         // Update progress display
         updateProgressDisplay();
-        
-        // Reset counters for next 5 min interval
-        correctFrames = 0; incorrectFrames = 0; totalFrames = 0;
     }
     
     // Initialize the application
@@ -0,0 +1,89 @@
+/**
+ * Landmark Codec
+ * Encodes pose landmarks into the compact binary frame format read by wire_format.py
+ */
+
+class LandmarkEncoder {
+    /**
+     * @param {Object} options
+     * @param {boolean} options.delta - Send differences from the previous frame
+     * @param {number} options.keyframeInterval - Send a full frame at least this often
+     */
+    constructor({ delta = true, keyframeInterval = 30 } = {}) {
+        this.delta = delta;
+        this.keyframeInterval = keyframeInterval;
+        this.previous = null;
+        this.sinceKeyframe = 0;
+    }
+
+    /**
+     * Encodes one frame
+     * @param {Array} landmarks - The 33 pose landmarks from MediaPipe
+     * @param {number} timestamp - Capture time in epoch milliseconds
+     * @returns {ArrayBuffer} Encoded frame
+     */
+    encode(landmarks, timestamp) {
+        const count = landmarks.length;
+        const buffer = new ArrayBuffer(LandmarkEncoder.HEADER_SIZE + count * 4 * 2);
+        const view = new DataView(buffer);
+        const values = new Int16Array(count * 4);
+        
+        landmarks.forEach((lm, i) => {
+            values[i * 4] = LandmarkEncoder._quantize(lm.x);
+            values[i * 4 + 1] = LandmarkEncoder._quantize(lm.y);
+            values[i * 4 + 2] = LandmarkEncoder._quantize(lm.z);
+            values[i * 4 + 3] = LandmarkEncoder._quantize(lm.visibility);
+        });
+        
+        const useDelta = this.delta && this.previous && this.previous.length === values.length &&
+                         this.sinceKeyframe < this.keyframeInterval;
+        this.sinceKeyframe = useDelta ? this.sinceKeyframe + 1 : 0;
+        
+        // Header
+        view.setUint8(0, 0x50); // 'P'
+        view.setUint8(1, 0x4c); // 'L'
+        view.setUint8(2, LandmarkEncoder.VERSION);
+        view.setUint8(3, useDelta ? LandmarkEncoder.FLAG_DELTA : 0);
+        view.setUint16(4, count, true);
+        view.setUint16(6, 0, true);
+        view.setFloat64(8, timestamp, true);
+        
+        // Payload (Int16Array arithmetic wraps, matching the decoder)
+        for (let i = 0; i < values.length; i++) {
+            const value = useDelta ? (values[i] - this.previous[i]) << 16 >> 16 : values[i];
+            view.setInt16(LandmarkEncoder.HEADER_SIZE + i * 2, value, true);
+        }
+        
+        this.previous = values;
+        return buffer;
+    }
+
+    /**
+     * Forces the next frame to be a full key frame (e.g. after reconnecting)
+     */
+    reset() {
+        this.previous = null;
+        this.sinceKeyframe = 0;
+    }
+
+    /**
+     * @private
+     * @param {number} value - Landmark component
+     * @returns {number} Quantized int16 value
+     */
+    static _quantize(value) {
+        return Math.max(-32767, Math.min(32767, Math.round((value || 0) * LandmarkEncoder.SCALE)));
+    }
+}
+
+LandmarkEncoder.VERSION = 1;
+LandmarkEncoder.HEADER_SIZE = 16;
+LandmarkEncoder.FLAG_DELTA = 0x1;
+LandmarkEncoder.SCALE = 10000;
+
+// Export the class for use in other files
+if (typeof module !== 'undefined' && typeof module.exports !== 'undefined') {
+    module.exports = LandmarkEncoder;
+} else {
+    window.LandmarkEncoder = LandmarkEncoder;
+}
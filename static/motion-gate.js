@@ -0,0 +1,75 @@
+/**
+ * Motion Gate for adaptive pose inference
+ * Skips pose detection on video frames that barely differ from the last analyzed frame
+ */
+
+class MotionGate {
+    /**
+     * @param {Object} options
+     * @param {number} options.threshold - Mean gray-level difference (0-255) that counts as motion
+     * @param {number} options.maxSkip - Maximum number of consecutive frames to skip
+     * @param {number} options.width - Width of the comparison thumbnail
+     * @param {number} options.height - Height of the comparison thumbnail
+     */
+    constructor({ threshold = 2, maxSkip = 5, width = 64, height = 48 } = {}) {
+        this.threshold = threshold;
+        this.maxSkip = maxSkip;
+        this.canvas = document.createElement('canvas');
+        this.canvas.width = width;
+        this.canvas.height = height;
+        this.ctx = this.canvas.getContext('2d', { willReadFrequently: true });
+        this.reference = new Uint8Array(width * height);
+        this.current = new Uint8Array(width * height);
+        this.hasReference = false;
+        this.skipped = 0;
+        this.frames = 0;
+        this.inferences = 0;
+    }
+
+    /**
+     * Decides whether the given frame needs pose inference
+     * @param {HTMLVideoElement} source - The video element to sample
+     * @returns {boolean} True if inference should run on this frame
+     */
+    shouldInfer(source) {
+        this.frames++;
+        const { width, height } = this.canvas;
+        this.ctx.drawImage(source, 0, 0, width, height);
+        const pixels = this.ctx.getImageData(0, 0, width, height).data;
+        
+        // Convert the thumbnail to grayscale and measure the difference in one pass
+        let diff = 0;
+        for (let i = 0, p = 0; i < this.current.length; i++, p += 4) {
+            const gray = (pixels[p] * 77 + pixels[p + 1] * 150 + pixels[p + 2] * 29) >> 8;
+            this.current[i] = gray;
+            diff += Math.abs(gray - this.reference[i]);
+        }
+        
+        if (this.hasReference && this.skipped < this.maxSkip && diff / this.current.length < this.threshold) {
+            this.skipped++;
+            return false;
+        }
+        
+        // Later frames are compared against this one, the last frame we ran inference on
+        [this.reference, this.current] = [this.current, this.reference];
+        this.hasReference = true;
+        this.skipped = 0;
+        this.inferences++;
+        return true;
+    }
+
+    /**
+     * Share of frames that ran inference
+     * @returns {number} Value between 0 and 1
+     */
+    get inferenceRate() {
+        return this.frames ? this.inferences / this.frames : 1;
+    }
+}
+
+// Export the class for use in other files
+if (typeof module !== 'undefined' && typeof module.exports !== 'undefined') {
+    module.exports = MotionGate;
+} else {
+    window.MotionGate = MotionGate;
+}
@@ -0,0 +1,121 @@
+/**
+ * Rolling Posture Statistics
+ * Tracks time spent in each posture state over sliding windows using real frame timestamps
+ */
+
+class RollingPostureStats {
+    /**
+     * Each frame accounts for the time since the previous frame (capped at maxGap, so pauses
+     * are not counted). Running totals are snapshotted into a ring buffer once per `resolution`
+     * seconds, so any window up to maxWindow is the current totals minus one snapshot.
+     * @param {Object} options
+     * @param {number} options.maxWindow - Longest supported window in seconds
+     * @param {number} options.resolution - Snapshot interval in seconds
+     * @param {number} options.maxGap - Longest gap between frames that still counts as tracked time
+     */
+    constructor({ maxWindow = 300, resolution = 1, maxGap = 1 } = {}) {
+        this.maxWindow = maxWindow;
+        this.resolution = resolution;
+        this.maxGap = maxGap;
+        this.size = Math.ceil(maxWindow / resolution) + 2;
+        this.rules = [];
+        this.totals = { correct: 0, incorrect: 0, rules: {} };
+        this.snapshots = new Array(this.size).fill(null);
+        this.start = null;
+        this.lastTime = null;
+        this.bucket = -1;
+    }
+
+    /**
+     * Adds a frame
+     * @param {number} time - Frame timestamp in seconds
+     * @param {boolean} isCorrect - Whether the posture was correct
+     * @param {Object} details - Rule results from analyzePresentationPosture
+     */
+    update(time, isCorrect, details = {}) {
+        if (this.start === null) {
+            this.start = this.lastTime = time;
+        }
+        const dt = Math.min(Math.max(time - this.lastTime, 0), this.maxGap);
+        this.lastTime = Math.max(time, this.lastTime);
+        
+        // Snapshot the totals as of the start of every bucket we have moved into
+        const bucket = Math.floor((this.lastTime - this.start) / this.resolution);
+        if (bucket > this.bucket) {
+            const snapshot = this._copyTotals();
+            for (let b = Math.max(this.bucket + 1, bucket - this.size + 1); b <= bucket; b++) {
+                this.snapshots[b % this.size] = snapshot;
+            }
+            this.bucket = bucket;
+        }
+        
+        if (isCorrect) {
+            this.totals.correct += dt;
+        } else {
+            this.totals.incorrect += dt;
+        }
+        for (const [rule, passed] of Object.entries(details)) {
+            if (!(rule in this.totals.rules)) {
+                this.totals.rules[rule] = 0;
+            }
+            if (!passed) {
+                this.totals.rules[rule] += dt;
+            }
+        }
+    }
+
+    /**
+     * Totals over the last `window` seconds, or the whole session when window is omitted
+     * @param {number} [window] - Window length in seconds, at most maxWindow
+     * @returns {Object} correctTime, incorrectTime, correctPercentage and ruleFailures (seconds)
+     */
+    query(window) {
+        let since = null;
+        if (window !== undefined && this.start !== null) {
+            // First bucket starting inside the window, so the window is never overcounted. A
+            // window shorter than resolution uses the current bucket: the next slot is stale.
+            const bucket = Math.min(
+                Math.ceil((this.lastTime - window - this.start) / this.resolution),
+                this.bucket
+            );
+            if (bucket > 0) {
+                since = this.snapshots[bucket % this.size];
+            }
+        }
+        
+        const correctTime = this.totals.correct - (since ? since.correct : 0);
+        const incorrectTime = this.totals.incorrect - (since ? since.incorrect : 0);
+        const totalTime = correctTime + incorrectTime;
+        const ruleFailures = {};
+        for (const [rule, seconds] of Object.entries(this.totals.rules)) {
+            ruleFailures[rule] = seconds - (since && since.rules[rule] ? since.rules[rule] : 0);
+        }
+        
+        return {
+            correctTime,
+            incorrectTime,
+            totalTime,
+            correctPercentage: totalTime > 0 ? (correctTime / totalTime) * 100 : 0,
+            ruleFailures
+        };
+    }
+
+    /**
+     * @private
+     * @returns {Object} A copy of the running totals
+     */
+    _copyTotals() {
+        return {
+            correct: this.totals.correct,
+            incorrect: this.totals.incorrect,
+            rules: Object.assign({}, this.totals.rules)
+        };
+    }
+}
+
+// Export the class for use in other files
+if (typeof module !== 'undefined' && typeof module.exports !== 'undefined') {
+    module.exports = RollingPostureStats;
+} else {
+    window.RollingPostureStats = RollingPostureStats;
+}
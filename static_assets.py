@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Pages and assets served from memory: every file is read, hashed and compressed once,
+# so a request is a dict lookup and a header comparison.
+
+COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+MIN_COMPRESS_SIZE = 256
+
+# Assets are also served under a content-hashed name (app.<hash>.js) that pages link to
+# and browsers may cache forever; the plain name must be revalidated.
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+_ASSET_REFERENCE = re.compile(r"""(["'])/static/([^"'?#]+)\1""")
+
+
+class Asset:
+    """One file's bytes, its precompressed variants and their validators."""
+
+    def __init__(self, name, body, media_type):
+        self.name = name
+        self.media_type = media_type
+        self.digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        # Content encoding -> (body, strong ETag); each representation gets its own tag
+        self.bodies = {"identity": (body, f'"{self.digest}"')}
+        if len(body) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE):
+            self._add("gzip", gzip.compress(body, compresslevel=9, mtime=0))
+            if brotli is not None:
+                self._add("br", brotli.compress(body, quality=11))
+
+    def _add(self, encoding, body):
+        if len(body) < len(self.bodies["identity"][0]):
+            self.bodies[encoding] = (body, f'"{self.digest}-{encoding}"')
+
+    @property
+    def hashed_name(self):
+        root, ext = os.path.splitext(self.name)
+        return f"{root}.{self.digest[:10]}{ext}"
+
+    def select(self, accept_encoding):
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding in ("br", "gzip"):
+            if encoding in self.bodies and encoding in accepted:
+                return encoding
+        return "identity"
+
+
+def parse_accept_encoding(header):
+    # Codings the client accepts, ignoring preference weights other than q=0
+    accepted = set()
+    for item in (header or "").lower().split(","):
+        coding, _, params = item.partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    return accepted
+
+
+def etag_matches(if_none_match, etag):
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def media_type_for(name):
+    media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    if media_type.startswith("text/") or media_type == "application/javascript":
+        media_type += "; charset=utf-8"
+    return media_type
+
+
+class StaticAssets:
+    """In-memory static files with precompressed bodies, strong ETags and hashed URLs.
+
+    Pages (e.g. index.html) are rewritten so their /static/ links point at the
+    content-hashed names. With reload=True, files are re-read when their mtime changes,
+    which is meant for development only.
+    """
+
+    def __init__(self, directory, pages=(), prefix="/static/", reload=False):
+        self.directory = directory
+        self.pages = tuple(pages)
+        self.prefix = prefix
+        self.reload = reload
+        self._mtimes = {}
+        self.load()
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    assets[name] = Asset(name, f.read(), media_type_for(name))
+
+        # Content-hashed aliases; the hash changes whenever the file does
+        hashed = {asset.hashed_name: asset for asset in assets.values()}
+
+        def link(match):
+            asset = assets.get(match.group(2))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group(1)}{self.prefix}{asset.hashed_name}{match.group(1)}"
+
+        pages = {}
+        for page in self.pages:
+            with open(page, "rb") as f:
+                html = f.read().decode("utf-8")
+            pages[page] = Asset(page, _ASSET_REFERENCE.sub(link, html).encode("utf-8"), media_type_for(page))
+
+        self.assets, self.hashed, self._pages = assets, hashed, pages
+        self._mtimes = self._scan_mtimes()
+
+    def _scan_mtimes(self):
+        mtimes = {}
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                path = os.path.join(root, filename)
+                mtimes[path] = os.stat(path).st_mtime_ns
+        for page in self.pages:
+            mtimes[page] = os.stat(page).st_mtime_ns
+        return mtimes
+
+    def _reload_if_changed(self):
+        if self._scan_mtimes() != self._mtimes:
+            self.load()
+
+    def page(self, name):
+        # (asset, cache-control) for a page, or None
+        if self.reload:
+            self._reload_if_changed()
+        asset = self._pages.get(name)
+        return None if asset is None else (asset, REVALIDATE)
+
+    def get(self, name):
+        # (asset, cache-control) for a path under the static directory, or None
+        if self.reload:
+            self._reload_if_changed()
+        asset = self.hashed.get(name)
+        if asset is not None:
+            return asset, IMMUTABLE
+        asset = self.assets.get(name)
+        return None if asset is None else (asset, REVALIDATE)
+
+    @staticmethod
+    def response(asset, cache_control, request_headers, method="GET"):
+        # Starlette response for the best encoding the client accepts, or 304 when its copy is current
+        from starlette.responses import Response
+
+        encoding = asset.select(request_headers.get("accept-encoding"))
+        body, etag = asset.bodies[encoding]
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+        if len(asset.bodies) > 1:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        if method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=asset.media_type, headers=headers)
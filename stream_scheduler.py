@@ -0,0 +1,321 @@
+import asyncio
+import collections
+import heapq
+import itertools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from async_detector import FrameDropped
+from detector_pool import get_pool
+from streaming import FrameRateController
+
+
+class FrameExpired(FrameDropped):
+    """Raised for a frame that could not start inference within its stream's latency budget."""
+
+
+class StreamLimitReached(RuntimeError):
+    """Raised by open_stream when max_streams streams stay open for longer than open_timeout."""
+
+
+class Stream:
+    """One client's frame stream: at most one pending frame, plus counters for stats()."""
+
+    # Achieved fps is measured over this many seconds of completions
+    FPS_WINDOW = 5.0
+
+    def __init__(self, stream_id, deadline, min_fps, max_fps, detector=None):
+        self.id = stream_id
+        self.deadline = deadline
+        self.rate = FrameRateController(min_fps, max_fps)
+        self.pending = None
+        # A frame of this stream is in inference; its next one waits until that finishes
+        self.busy = False
+        self.closed = False
+        # Detector owned by this stream while it is open, so tracking state is never shared
+        self.detector = detector
+        self.submitted = 0
+        self.processed = 0
+        self.replaced = 0
+        self.expired = 0
+        self.target_fps = max_fps
+        # When this stream last had a frame sent to inference; the longest-waiting stream goes first
+        self.last_served = 0.0
+        self._completed = collections.deque()
+
+    def record(self, now, latency):
+        self.processed += 1
+        self.rate.update(latency)
+        self._completed.append(now)
+        while self._completed[0] < now - self.FPS_WINDOW:
+            self._completed.popleft()
+
+    def fps(self, now):
+        while self._completed and self._completed[0] < now - self.FPS_WINDOW:
+            self._completed.popleft()
+        return len(self._completed) / self.FPS_WINDOW
+
+
+class StreamScheduler:
+    """Shares pose inference fairly between many frame streams.
+
+    Each stream holds at most one pending frame (a newer frame replaces it, failing the old
+    one with FrameDropped), and the stream served least recently goes next, so a fast sender
+    cannot take more than its turn and a stream whose frames expired is first in line. Every
+    frame must start inference within its stream's `deadline` seconds of arriving; later ones
+    fail with FrameExpired instead of being processed late. When more streams are waiting
+    than there are idle workers, up to `max_batch` frames from different streams go to one
+    worker together, sharing a single executor dispatch.
+
+    open_stream() checks a detector out of the pool (loading it off the event loop and the
+    workers if none is idle) and the stream keeps it until close_stream(), with at most one
+    frame in inference at a time, so MediaPipe's video-mode tracking follows that stream
+    alone. At most `max_streams` streams (default: 4 per worker) hold a detector; further
+    ones wait up to `open_timeout` seconds for a stream to close, then fail with
+    StreamLimitReached. Frames may be submitted still encoded, with a
+    `decode` callable that the worker runs before inference, so decoding stays off the event
+    loop and is skipped for frames that are dropped.
+
+    Each stream's target_fps is the lower of what its own latency allows and its fair share
+    of the measured capacity, so clients can send fewer frames as load grows.
+    """
+
+    def __init__(self, workers=1, max_batch=2, deadline=0.5, min_fps=2.0, max_fps=30.0,
+                 options=None, pool=None, max_streams=None, open_timeout=10.0):
+        self.workers = workers
+        self.max_streams = max_streams or 4 * workers
+        self.open_timeout = open_timeout
+        self.max_batch = max_batch
+        self.deadline = deadline
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.options = options or {}
+        self.pool = pool or get_pool()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="pose-schedule")
+        self._streams = {}
+        # One per open stream, i.e. per loaded detector; created on the event loop by open_stream
+        self._slots = None
+        self.waiting = 0
+        # Heap of (last_served, sequence, stream) for streams with a pending frame
+        self._ready = []
+        self._sequence = itertools.count()
+        self._ids = 0
+        self._in_flight = 0
+        # Smoothed seconds of inference per frame, for the capacity estimate
+        self.service_time = None
+        self.replaced = 0
+        self.expired = 0
+
+    @property
+    def queue_depth(self):
+        return len(self._ready)
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    @property
+    def capacity_fps(self):
+        # Frames per second all workers can process at the measured inference time
+        if not self.service_time:
+            return None
+        return self.workers / self.service_time
+
+    async def open_stream(self, deadline=None):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_streams)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.open_timeout)
+        except asyncio.TimeoutError:
+            raise StreamLimitReached(f"all {self.max_streams} streams are in use") from None
+        finally:
+            self.waiting -= 1
+        loop = asyncio.get_running_loop()
+        # Loading a model can take seconds: keep it off the inference workers and out of service_time
+        checkout = loop.run_in_executor(None, self._checkout_detector)
+        try:
+            detector = await asyncio.shield(checkout)
+        except BaseException:
+            checkout.add_done_callback(self._return_detector)
+            self._slots.release()
+            raise
+        self._ids += 1
+        stream = Stream(
+            self._ids, self.deadline if deadline is None else deadline, self.min_fps, self.max_fps, detector
+        )
+        self._streams[stream.id] = stream
+        self._update_targets()
+        return stream
+
+    def _checkout_detector(self):
+        detector = self.pool.acquire(**self.options)
+        # A pooled detector may still track another stream's last frame
+        detector.reset()
+        return detector
+
+    def _return_detector(self, checkout):
+        # A detector loaded for an open_stream() call that was cancelled
+        if not checkout.cancelled() and checkout.exception() is None:
+            self.pool.release(checkout.result(), **self.options)
+
+    def close_stream(self, stream):
+        self._streams.pop(stream.id, None)
+        stream.closed = True
+        if stream.pending is not None:
+            stream.pending[-1].cancel()
+            stream.pending = None
+        if not stream.busy:
+            self._release(stream)
+        self._update_targets()
+
+    def _release(self, stream):
+        # Return a closed stream's detector once no frame of it is in inference
+        if stream.detector is not None:
+            self.pool.release(stream.detector, **self.options)
+            stream.detector = None
+            self._slots.release()
+
+    async def submit(self, stream, img, received_at=None, decode=None):
+        """Detect landmarks in img for stream. received_at is its arrival time on time.perf_counter().
+
+        With decode, img is passed through decode(img) on the worker first; exceptions it
+        raises are raised here.
+        """
+        loop = asyncio.get_running_loop()
+        arrival = time.perf_counter() if received_at is None else received_at
+        future = loop.create_future()
+        stream.submitted += 1
+        if stream.pending is not None:
+            previous = stream.pending[-1]
+            stream.replaced += 1
+            self.replaced += 1
+            if not previous.done():
+                previous.set_exception(FrameDropped("frame dropped for a newer one"))
+        elif not stream.busy:
+            heapq.heappush(self._ready, (stream.last_served, next(self._sequence), stream))
+        stream.pending = (img, decode, arrival, arrival + stream.deadline, future)
+        self._dispatch(loop)
+        return await future
+
+    def _dispatch(self, loop):
+        while self._in_flight < self.workers and self._ready:
+            # Batch only when there are more waiting streams than idle workers
+            size = min(self.max_batch, math.ceil(len(self._ready) / (self.workers - self._in_flight)))
+            now = time.perf_counter()
+            batch = []
+            while self._ready and len(batch) < size:
+                stream = heapq.heappop(self._ready)[2]
+                if stream.pending is None:
+                    # Closed while waiting
+                    continue
+                img, decode, arrival, deadline, future = stream.pending
+                stream.pending = None
+                if future.done():
+                    continue
+                if now > deadline:
+                    self._expire(stream, future)
+                    continue
+                stream.last_served = now
+                stream.busy = True
+                batch.append((stream, img, decode, arrival, deadline, future))
+            if not batch:
+                continue
+            self._in_flight += 1
+            frames = [(stream, img, decode, deadline) for stream, img, decode, _, deadline, _ in batch]
+            task = loop.run_in_executor(self._executor, self._run_batch, frames)
+            task.add_done_callback(lambda done, batch=batch: self._finish(loop, batch, done))
+
+    def _run_batch(self, frames):
+        # Runs on a worker thread. Frames whose deadline passed while earlier ones ran are skipped.
+        outcomes = []
+        for stream, img, decode, deadline in frames:
+            start = time.perf_counter()
+            if start > deadline:
+                outcomes.append(None)
+                continue
+            try:
+                if decode is not None:
+                    img = decode(img)
+                outcomes.append((stream.detector.detect(img), time.perf_counter() - start))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    def _finish(self, loop, batch, done):
+        self._in_flight -= 1
+        now = time.perf_counter()
+        for stream, *_ in batch:
+            stream.busy = False
+            if stream.closed:
+                self._release(stream)
+            elif stream.pending is not None:
+                # Its next frame arrived while this one ran
+                heapq.heappush(self._ready, (stream.last_served, next(self._sequence), stream))
+        if done.cancelled() or done.exception() is not None:
+            for *_, future in batch:
+                if not future.done():
+                    if done.cancelled():
+                        future.cancel()
+                    else:
+                        future.set_exception(done.exception())
+        else:
+            for (stream, _, _, arrival, _, future), outcome in zip(batch, done.result()):
+                if outcome is None:
+                    self._expire(stream, future)
+                elif isinstance(outcome, Exception):
+                    if not future.done():
+                        future.set_exception(outcome)
+                else:
+                    landmarks, service_time = outcome
+                    if self.service_time is None:
+                        self.service_time = service_time
+                    else:
+                        self.service_time += 0.1 * (service_time - self.service_time)
+                    stream.record(now, now - arrival)
+                    if not future.done():
+                        future.set_result(landmarks)
+            self._update_targets()
+        self._dispatch(loop)
+
+    def _expire(self, stream, future):
+        stream.expired += 1
+        self.expired += 1
+        if not future.done():
+            future.set_exception(FrameExpired("frame missed its latency deadline"))
+
+    def _update_targets(self):
+        # Shed load by lowering every stream's rate to its share of the capacity
+        capacity = self.capacity_fps
+        share = capacity / len(self._streams) if capacity and self._streams else self.max_fps
+        for stream in self._streams.values():
+            stream.target_fps = max(self.min_fps, min(stream.rate.target_fps, share))
+
+    def stats(self):
+        now = time.perf_counter()
+        capacity = self.capacity_fps
+        return {
+            "workers": self.workers,
+            "maxStreams": self.max_streams,
+            "waitingStreams": self.waiting,
+            "capacityFps": None if capacity is None else round(capacity, 1),
+            "queueDepth": self.queue_depth,
+            "inFlight": self.in_flight,
+            "streams": [
+                {
+                    "id": stream.id,
+                    "fps": round(stream.fps(now), 1),
+                    "targetFps": round(stream.target_fps, 1),
+                    "latencyMs": None if stream.rate.latency is None else round(stream.rate.latency * 1000, 1),
+                    "submitted": stream.submitted,
+                    "processed": stream.processed,
+                    "replaced": stream.replaced,
+                    "expired": stream.expired,
+                }
+                for stream in self._streams.values()
+            ],
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
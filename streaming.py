@@ -0,0 +1,73 @@
+import asyncio
+
+
+class LatestSlot:
+    """Single-item mailbox for one connection: a new item replaces an unread one.
+
+    Producers never wait and memory stays bounded at one item, so a consumer that falls
+    behind sees the newest data instead of working through a backlog. `dropped` counts
+    the items that were overwritten before being read, and are also added to `drop_counter`
+    (e.g. a metrics.Counter shared by all connections) when one is given.
+    """
+
+    def __init__(self, drop_counter=None):
+        self._item = None
+        self._has_item = False
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+        self.drop_counter = drop_counter
+
+    def put(self, item):
+        if self._has_item:
+            self.dropped += 1
+            if self.drop_counter is not None:
+                self.drop_counter.inc()
+        self._item = item
+        self._has_item = True
+        self.received += 1
+        self._event.set()
+
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+    async def get(self):
+        # Returns the newest item, or None once the slot is closed and drained
+        while not self._has_item:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        item = self._item
+        self._item = None
+        self._has_item = False
+        return item
+
+
+class FrameRateController:
+    """Suggests a per-stream frame rate from the observed processing latency.
+
+    When inference slows down because the CPU is shared by more streams, latency rises and
+    the suggested rate falls, so clients stop sending frames the server would only discard.
+    """
+
+    def __init__(self, min_fps=2.0, max_fps=30.0, smoothing=0.2):
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.smoothing = smoothing
+        self.latency = None
+
+    def update(self, latency):
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+        return self.target_fps
+
+    @property
+    def target_fps(self):
+        if not self.latency:
+            return self.max_fps
+        return max(self.min_fps, min(self.max_fps, 1.0 / self.latency))
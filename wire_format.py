@@ -0,0 +1,74 @@
+import struct
+
+import numpy as np
+
+from pose_detector import NUM_LANDMARKS
+
+# Binary landmark frame, little-endian:
+#   magic    2s   b"PL"
+#   version  u8
+#   flags    u8   FLAG_DELTA | FLAG_FLOAT16
+#   count    u16  number of landmarks (33)
+#   reserved u16
+#   t        f64  capture time, epoch milliseconds
+# followed by count * 4 values (x, y, z, visibility):
+#   int16, each value quantized as round(v * SCALE), or the wrapping difference from
+#   the previous frame's quantized values when FLAG_DELTA is set; or
+#   float16 when FLAG_FLOAT16 is set (never combined with FLAG_DELTA).
+MAGIC = b"PL"
+VERSION = 1
+HEADER = struct.Struct("<2sBBHHd")
+FLAG_DELTA = 0x1
+FLAG_FLOAT16 = 0x2
+SCALE = 10000.0
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def encode_frame(landmarks, t, previous=None, float16=False):
+    """Encode (33, 4) landmarks. Pass the previous frame's quantized values to delta-encode.
+
+    Returns (bytes, quantized) where quantized is the int16 array to pass as `previous` next time.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)[:, :4]
+    if float16:
+        header = HEADER.pack(MAGIC, VERSION, FLAG_FLOAT16, len(landmarks), 0, t)
+        return header + landmarks.astype("<f2").tobytes(), None
+    quantized = np.round(np.clip(landmarks * SCALE, -32767, 32767)).astype("<i2")
+    if previous is None:
+        flags, payload = 0, quantized
+    else:
+        flags, payload = FLAG_DELTA, quantized - previous
+    return HEADER.pack(MAGIC, VERSION, flags, len(landmarks), 0, t) + payload.tobytes(), quantized
+
+
+class FrameDecoder:
+    """Decodes one connection's binary frames; delta frames apply to the previous frame."""
+
+    def __init__(self):
+        self._previous = None
+
+    def decode(self, data):
+        # Returns (t in epoch milliseconds, (33, 4) float32 landmarks)
+        if len(data) < HEADER.size:
+            raise WireFormatError("frame shorter than header")
+        magic, version, flags, count, _, t = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise WireFormatError(f"unsupported frame (magic {magic!r}, version {version})")
+        if count != NUM_LANDMARKS or len(data) != HEADER.size + count * 4 * 2:
+            raise WireFormatError("unexpected landmark count or frame size")
+
+        if flags & FLAG_FLOAT16:
+            values = np.frombuffer(data, dtype="<f2", offset=HEADER.size).reshape(count, 4)
+            return t, values.astype(np.float32)
+
+        values = np.frombuffer(data, dtype="<i2", offset=HEADER.size).reshape(count, 4)
+        if flags & FLAG_DELTA:
+            if self._previous is None:
+                raise WireFormatError("delta frame without a previous key frame")
+            # int16 addition wraps exactly like the encoder's subtraction
+            values = self._previous + values
+        self._previous = values
+        return t, values * np.float32(1.0 / SCALE)